@@ -21,10 +21,30 @@ import os
 import subprocess
 import sys
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
 import base64
+import io
+import re
+import gzip
+import zlib
+import struct
 import tempfile
+import urllib.request
+import xml.etree.ElementTree as ET
+import html
+from html.parser import HTMLParser
+from urllib.parse import urlsplit, urlunsplit, urljoin, urlencode, parse_qsl, quote, unquote
+from urllib.robotparser import RobotFileParser
+import threading
+import time
+import random
+import uuid
+import logging
+from logging.handlers import RotatingFileHandler
+from contextlib import contextmanager, ExitStack
+from collections import deque, defaultdict, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
 
 # bcrypt 설치 확인 및 대체
 try:
@@ -33,6 +53,20 @@ try:
 except ImportError:
     USE_BCRYPT = False
 
+# Pillow 설치 확인 (타일 캡처 합성용)
+try:
+    from PIL import Image, ImageDraw, ImageFont
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+# NumPy 설치 확인 (이미지 비교용)
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
 # Playwright 설치 확인 및 자동 설치
 PLAYWRIGHT_AVAILABLE = False
 BROWSERS_INSTALLED = False
@@ -317,6 +351,16 @@ CUSTOM_CSS = """
     color: white;
 }
 
+.badge-error {
+    background: linear-gradient(135deg, #e53935, #c62828);
+    color: white;
+}
+
+.badge-warning {
+    background: linear-gradient(135deg, #ffb300, #fb8c00);
+    color: #1E1E1E;
+}
+
 /* 다운로드 버튼 */
 .download-btn {
     display: inline-block;
@@ -382,9 +426,159 @@ def init_db():
         )
     """)
     
+    # 캡처 통계 테이블 (호스트별 로드 시간/실패 사유)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS capture_stats (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            host TEXT NOT NULL,
+            target TEXT NOT NULL,
+            load_ms INTEGER,
+            ok INTEGER NOT NULL,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    
+    # 이미지 저장소 (내용 해시 기준, 이력/공유 캐시가 같은 이미지를 참조)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS blobs (
+            hash TEXT PRIMARY KEY,
+            data BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    
+    # 사용자 간 공유 캡처 캐시 (정규화 URL + 대상 + 캡처 프로필)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS capture_cache (
+            cache_key TEXT PRIMARY KEY,
+            url TEXT NOT NULL,
+            target TEXT NOT NULL,
+            profile TEXT NOT NULL,
+            blob_hash TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            last_access REAL NOT NULL
+        )
+    """)
+    
+    # 정기 검사 URL 세트 (urls: [[제목, URL], ...] JSON)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS url_sets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            urls TEXT NOT NULL,
+            profiles TEXT,
+            interval_days INTEGER NOT NULL,
+            next_run REAL NOT NULL,
+            last_run REAL,
+            enabled INTEGER DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    """)
+    
+    # W3C 검사기 메시지 (이력별 오류/경고 목록)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS w3c_messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            history_id INTEGER NOT NULL,
+            type TEXT NOT NULL,
+            line INTEGER,
+            extract TEXT,
+            message TEXT,
+            FOREIGN KEY (history_id) REFERENCES history (id)
+        )
+    """)
+    
+    # 기존 DB 마이그레이션 (컬럼 추가)
+    ensure_column(cursor, 'history', 'diff_data', 'TEXT')
+    ensure_column(cursor, 'history', 'change_score', 'REAL')
+    ensure_column(cursor, 'history', 'errors', 'TEXT')
+    # W3C 오류/경고 수 (NULL = 구조화 결과 없음)
+    ensure_column(cursor, 'history', 'w3c_errors', 'INTEGER')
+    ensure_column(cursor, 'history', 'w3c_warnings', 'INTEGER')
+    # 검사 진행 상태 (running / done / failed, NULL = 이전 버전 이력)
+    ensure_column(cursor, 'history', 'status', 'TEXT')
+    # 호스트 검색 조건용 (컬럼 추가 시 기존 이력 채움)
+    if ensure_column(cursor, 'history', 'host', 'TEXT'):
+        cursor.execute("SELECT id, url FROM history")
+        cursor.executemany("UPDATE history SET host = ? WHERE id = ?",
+                           [(urlsplit(url).hostname or '', hid) for hid, url in cursor.fetchall()])
+    # 캡처 영역 (CSS 선택자 또는 x,y,너비,높이, NULL = 화면 전체)
+    ensure_column(cursor, 'history', 'capture_region', 'TEXT')
+    # 정기 검사 기준 시각 (지터를 더하기 전 주기 시각, 컬럼 추가 시 다음 실행 시각으로 채움)
+    if ensure_column(cursor, 'url_sets', 'base_run', 'REAL'):
+        cursor.execute("UPDATE url_sets SET base_run = next_run")
+    
+    # 제목/URL 전문 검색 인덱스 (history 변경 시 트리거로 갱신)
+    init_history_fts(cursor)
+    
+    # 같은 URL의 직전 이력 조회용 인덱스
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_history_user_url ON history (user_id, url, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_capture_stats_host ON capture_stats (host, ok, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_capture_cache_access ON capture_cache (last_access)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_w3c_messages_history_type ON w3c_messages (history_id, type)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_w3c_messages_type_history ON w3c_messages (type, history_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_history_user_w3c_errors ON history (user_id, w3c_errors)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_url_sets_due ON url_sets (enabled, next_run)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_history_user_id ON history (user_id, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_history_user_host ON history (user_id, host, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_history_user_created ON history (user_id, created_at)")
+    
     conn.commit()
     conn.close()
 
+def ensure_column(cursor, table: str, column: str, definition: str) -> bool:
+    """테이블에 컬럼이 없으면 추가 (추가했으면 True)"""
+    cursor.execute(f"PRAGMA table_info({table})")
+    if column not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        return True
+    return False
+
+def init_history_fts(cursor):
+    """history 제목/URL FTS5 인덱스와 동기화 트리거 생성 (FTS5 미지원 시 생략)"""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'history_fts'")
+    if cursor.fetchone():
+        return
+    # trigram은 한글/URL 부분 일치 검색 지원 (SQLite 3.34+), 없으면 기본 토크나이저
+    for tokenizer in ('trigram', 'unicode61'):
+        try:
+            cursor.execute(f"""
+                CREATE VIRTUAL TABLE history_fts USING fts5(
+                    page_title, url, content='history', content_rowid='id', tokenize='{tokenizer}'
+                )
+            """)
+            break
+        except sqlite3.OperationalError:
+            continue
+    else:
+        return
+    
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS history_fts_insert AFTER INSERT ON history BEGIN
+            INSERT INTO history_fts (rowid, page_title, url) VALUES (new.id, new.page_title, new.url);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS history_fts_delete AFTER DELETE ON history BEGIN
+            INSERT INTO history_fts (history_fts, rowid, page_title, url) 
+            VALUES ('delete', old.id, old.page_title, old.url);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS history_fts_update AFTER UPDATE OF page_title, url ON history BEGIN
+            INSERT INTO history_fts (history_fts, rowid, page_title, url) 
+            VALUES ('delete', old.id, old.page_title, old.url);
+            INSERT INTO history_fts (rowid, page_title, url) VALUES (new.id, new.page_title, new.url);
+        END
+    """)
+    # 기존 이력 색인
+    cursor.execute("INSERT INTO history_fts (history_fts) VALUES ('rebuild')")
+
 def hash_password(password: str) -> str:
     """비밀번호 해싱"""
     if USE_BCRYPT:
@@ -430,37 +624,426 @@ def authenticate_user(username: str, password: str) -> tuple:
         return True, result[0]
     return False, None
 
-def save_history(user_id: int, page_title: str, url: str, screenshot_data: dict):
-    """검사 히스토리 저장 (base64 이미지 포함)"""
+def start_history(user_id: int, page_title: str, url: str, region: str = None) -> int:
+    """검사 시작 시 진행 중 이력 생성 (캡처는 완료되는 대로 추가)"""
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     cursor.execute("""
-        INSERT INTO history (user_id, page_title, url, screenshot_data)
-        VALUES (?, ?, ?, ?)
-    """, (user_id, page_title, url, json.dumps(screenshot_data)))
+        INSERT INTO history (user_id, page_title, url, host, screenshot_data, status, capture_region)
+        VALUES (?, ?, ?, ?, '{}', 'running', ?)
+    """, (user_id, page_title, url, urlsplit(url).hostname or '', region))
+    history_id = cursor.lastrowid
     conn.commit()
     conn.close()
+    return history_id
+
+def add_history_capture(history_id: int, key: str, ref: str):
+    """이력에 캡처 참조 하나 추가 (작업자 스레드에서 개별 커밋)"""
+    with trace_span('db.add_capture', key=key):
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE history SET screenshot_data = json_set(COALESCE(screenshot_data, '{}'), ?, ?) 
+            WHERE id = ?
+        """, (f'$."{key}"', ref, history_id))
+        conn.commit()
+        conn.close()
+
+def finish_history(history_id: int, diff_data: dict = None, change_score: float = None,
+                   errors: dict = None, w3c_messages: list = None, status: str = 'done'):
+    """검사 종료 시 비교 결과, 변경 점수, 실패 사유, W3C 메시지 저장"""
+    w3c_errors = w3c_warnings = None
+    if w3c_messages is not None:
+        w3c_errors = sum(1 for m in w3c_messages if m['type'] == 'error')
+        w3c_warnings = sum(1 for m in w3c_messages if m['type'] == 'warning')
+    
+    with trace_span('db.save_history', history_id=history_id):
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE history SET diff_data = ?, change_score = ?, errors = ?, 
+                               w3c_errors = ?, w3c_warnings = ?, status = ? 
+            WHERE id = ?
+        """, (json.dumps(diff_data) if diff_data else None, change_score,
+              json.dumps(errors, ensure_ascii=False) if errors else None,
+              w3c_errors, w3c_warnings, status, history_id))
+        if w3c_messages:
+            cursor.executemany("""
+                INSERT INTO w3c_messages (history_id, type, line, extract, message)
+                VALUES (?, ?, ?, ?, ?)
+            """, [(history_id, m['type'], m.get('line'), m.get('extract'), m.get('message'))
+                  for m in w3c_messages])
+        conn.commit()
+        conn.close()
+
+HISTORY_PAGE_SIZE = 10
+HISTORY_COUNT_LIMIT = 1000
+
+# 이력 결과 조건 (검색 필터)
+HISTORY_RESULT_FILTERS = {
+    'all': '전체',
+    'ok': '정상 완료',
+    'failed': '실패 포함',
+    'w3c_errors': 'W3C 오류 있음',
+    'changed': '이전 대비 변경',
+}
+
+def _fts_query(term: str) -> str:
+    """검색어 한 단어를 FTS5 구문으로 (특수문자 그대로 검색)"""
+    return '"' + term.replace('"', '""') + '"'
 
-def get_user_history(user_id: int) -> list:
-    """사용자의 검사 히스토리 조회"""
+def _history_conditions(cursor, user_id: int, query: str = None, host: str = None,
+                        date_from: str = None, date_to: str = None, result: str = 'all',
+                        min_change: float = None, min_w3c_errors: int = None) -> tuple:
+    """검색 조건 WHERE 절과 파라미터"""
+    conditions = ["h.user_id = ?"]
+    params = [user_id]
+    
+    terms = (query or '').split()
+    if terms:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'history_fts'")
+        use_fts = cursor.fetchone() is not None
+        # trigram 색인은 3글자 미만 단어를 찾지 못하므로 짧은 단어는 LIKE로 검색
+        fts_terms = [t for t in terms if use_fts and len(t) >= 3]
+        if fts_terms:
+            conditions.append("h.id IN (SELECT rowid FROM history_fts WHERE history_fts MATCH ?)")
+            params.append(' AND '.join(_fts_query(t) for t in fts_terms))
+        for term in terms:
+            if term not in fts_terms:
+                conditions.append("(h.page_title LIKE ? OR h.url LIKE ?)")
+                params += [f"%{term}%"] * 2
+    if host:
+        conditions.append("h.host = ?")
+        params.append(host)
+    if date_from:
+        conditions.append("h.created_at >= ?")
+        params.append(str(date_from))
+    if date_to:
+        conditions.append("h.created_at < date(?, '+1 day')")
+        params.append(str(date_to))
+    
+    if result == 'ok':
+        conditions.append("h.errors IS NULL AND (h.status IS NULL OR h.status = 'done')")
+    elif result == 'failed':
+        conditions.append("(h.errors IS NOT NULL OR h.status = 'failed')")
+    elif result == 'w3c_errors':
+        conditions.append("h.w3c_errors >= ?")
+        params.append(min_w3c_errors or 1)
+    elif result == 'changed':
+        conditions.append("h.change_score >= ?")
+        params.append(REGRESSION_THRESHOLD if min_change is None else min_change)
+    return ' AND '.join(conditions), params
+
+def search_history(user_id: int, query: str = None, host: str = None, date_from: str = None,
+                   date_to: str = None, result: str = 'all', min_change: float = None,
+                   min_w3c_errors: int = None, limit: int = 10, offset: int = 0) -> tuple:
+    """검사 이력 검색 (제목/URL 전문 검색 + 호스트/기간/결과 조건), (목록, 건수) 반환
+
+    건수는 HISTORY_COUNT_LIMIT을 넘으면 HISTORY_COUNT_LIMIT + 1
+    """
+    with trace_span('db.search_history', query=bool(query), host=bool(host)):
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+        where, params = _history_conditions(cursor, user_id, query, host, date_from, date_to,
+                                            result, min_change, min_w3c_errors)
+        # 전체 건수는 상한까지만 셈 (많은 이력에서 COUNT 전체 스캔 방지)
+        cursor.execute(f"SELECT COUNT(*) FROM (SELECT 1 FROM history h WHERE {where} LIMIT ?)",
+                       params + [HISTORY_COUNT_LIMIT + 1])
+        total = cursor.fetchone()[0]
+        cursor.execute(f"""
+            SELECT h.id, h.page_title, h.url, h.created_at, h.change_score, h.w3c_errors, h.w3c_warnings 
+            FROM history h 
+            WHERE {where} 
+            ORDER BY h.id DESC 
+            LIMIT ? OFFSET ?
+        """, params + [limit, offset])
+        results = cursor.fetchall()
+        conn.close()
+    return results, total
+
+def iter_history_ids(user_id: int, batch_size: int = 200, **filters):
+    """검색 조건에 맞는 이력 ID를 오래된 순으로 나눠 조회 (대량 보고서용)"""
+    last_id = 0
+    while True:
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+        where, params = _history_conditions(cursor, user_id, **filters)
+        cursor.execute(f"""
+            SELECT h.id FROM history h 
+            WHERE {where} AND h.id > ? 
+            ORDER BY h.id 
+            LIMIT ?
+        """, params + [last_id, batch_size])
+        ids = [row[0] for row in cursor.fetchall()]
+        conn.close()
+        yield from ids
+        if len(ids) < batch_size:
+            return
+        last_id = ids[-1]
+
+def get_history_hosts(user_id: int, limit: int = 50) -> list:
+    """사용자 이력의 호스트별 건수 (검색 조건 선택지)"""
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     cursor.execute("""
-        SELECT id, page_title, url, screenshot_data, created_at 
-        FROM history 
+        SELECT host, COUNT(*) FROM history 
+        WHERE user_id = ? AND host IS NOT NULL AND host != '' 
+        GROUP BY host 
+        ORDER BY COUNT(*) DESC 
+        LIMIT ?
+    """, (user_id, limit))
+    results = cursor.fetchall()
+    conn.close()
+    return results
+
+def create_url_set(user_id: int, name: str, urls: list, profiles: list, interval_days: int,
+                   first_run: float, jitter: float = 0.0) -> int:
+    """정기 검사 URL 세트 저장 (first_run이 주기의 기준 시각, 실제 실행은 jitter 범위 내에서 늦춤)"""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT INTO url_sets (user_id, name, urls, profiles, interval_days, next_run, base_run)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, (user_id, name, json.dumps(urls, ensure_ascii=False), json.dumps(profiles),
+          interval_days, first_run + random.uniform(0, jitter), first_run))
+    set_id = cursor.lastrowid
+    conn.commit()
+    conn.close()
+    return set_id
+
+def _url_set_from_row(row) -> dict:
+    return {
+        'id': row[0], 'user_id': row[1], 'name': row[2], 'urls': json.loads(row[3]),
+        'profiles': json.loads(row[4]) if row[4] else ['desktop'], 'interval_days': row[5],
+        'next_run': row[6], 'last_run': row[7], 'enabled': bool(row[8]),
+    }
+
+def get_user_url_sets(user_id: int) -> list:
+    """사용자의 정기 검사 URL 세트 목록"""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT id, user_id, name, urls, profiles, interval_days, next_run, last_run, enabled 
+        FROM url_sets 
         WHERE user_id = ? 
-        ORDER BY created_at DESC
+        ORDER BY id
     """, (user_id,))
-    results = cursor.fetchall()
+    results = [_url_set_from_row(row) for row in cursor.fetchall()]
+    conn.close()
+    return results
+
+def update_url_set(set_id: int, user_id: int, enabled: bool = None, next_run: float = None):
+    """URL 세트 사용 여부/다음 실행 시각 변경"""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    if enabled is not None:
+        cursor.execute("UPDATE url_sets SET enabled = ? WHERE id = ? AND user_id = ?",
+                       (int(enabled), set_id, user_id))
+    if next_run is not None:
+        cursor.execute("UPDATE url_sets SET next_run = ? WHERE id = ? AND user_id = ?",
+                       (next_run, set_id, user_id))
+    conn.commit()
+    conn.close()
+
+def delete_url_set(set_id: int, user_id: int):
+    """URL 세트 삭제 (이미 저장된 검사 이력은 유지)"""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM url_sets WHERE id = ? AND user_id = ?", (set_id, user_id))
+    conn.commit()
+    conn.close()
+
+def claim_due_url_sets(now: float, jitter: float, limit: int) -> list:
+    """실행할 때가 된 URL 세트를 가져오면서 다음 실행 시각을 미룸
+
+    다음 실행 시각을 조건부 UPDATE로 옮겨 여러 프로세스가 같은 세트를 중복 실행하지 않게 하고,
+    jitter 범위의 무작위 지연을 더해 같은 시각에 몰린 세트가 다음 주기에는 흩어지게 한다.
+    지연은 기준 시각(base_run)에만 더하고 기준 시각 자체는 주기 단위로만 옮기므로 누적되지 않는다.
+    """
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT id, user_id, name, urls, profiles, interval_days, next_run, last_run, enabled, base_run 
+        FROM url_sets 
+        WHERE enabled = 1 AND next_run <= ? 
+        ORDER BY next_run 
+        LIMIT ?
+    """, (now, limit))
+    claimed = []
+    for row in cursor.fetchall():
+        url_set = _url_set_from_row(row)
+        interval = url_set['interval_days'] * 86400
+        # 지금 이후의 첫 주기 시각 (오래 밀렸으면(서버 중단 등) 놓친 주기는 건너뛰고,
+        # '바로 실행'으로 주기 전에 실행했으면 원래 주기 시각 유지)
+        base_run = row[9] if row[9] is not None else url_set['next_run']
+        if base_run <= now:
+            base_run += ((now - base_run) // interval + 1) * interval
+        next_run = base_run + random.uniform(0, jitter)
+        cursor.execute("""
+            UPDATE url_sets SET next_run = ?, base_run = ?, last_run = ? 
+            WHERE id = ? AND next_run = ?
+        """, (next_run, base_run, now, url_set['id'], url_set['next_run']))
+        if cursor.rowcount:
+            claimed.append(url_set)
+    conn.commit()
+    conn.close()
+    return claimed
+
+def get_w3c_messages(history_id: int, message_type: str = None) -> list:
+    """이력의 W3C 메시지 목록 (type 지정 시 해당 유형만)"""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    if message_type:
+        cursor.execute("""
+            SELECT type, line, extract, message FROM w3c_messages 
+            WHERE history_id = ? AND type = ? 
+            ORDER BY id
+        """, (history_id, message_type))
+    else:
+        cursor.execute("""
+            SELECT type, line, extract, message FROM w3c_messages 
+            WHERE history_id = ? 
+            ORDER BY id
+        """, (history_id,))
+    results = [
+        {'type': row[0], 'line': row[1], 'extract': row[2], 'message': row[3]}
+        for row in cursor.fetchall()
+    ]
+    conn.close()
+    return results
+
+def put_blob(data: bytes) -> str:
+    """이미지 저장 (같은 내용은 한 번만 저장) 후 해시 반환"""
+    blob_hash = hashlib.sha256(data).hexdigest()
+    with trace_span('db.put_blob', bytes=len(data)):
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+        cursor.execute("INSERT OR IGNORE INTO blobs (hash, data, size) VALUES (?, ?, ?)",
+                       (blob_hash, sqlite3.Binary(data), len(data)))
+        conn.commit()
+        conn.close()
+    return blob_hash
+
+def get_blob(blob_hash: str) -> bytes:
+    """해시로 이미지 조회"""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute("SELECT data FROM blobs WHERE hash = ?", (blob_hash,))
+    result = cursor.fetchone()
+    conn.close()
+    return bytes(result[0]) if result else None
+
+def get_cached_capture(cache_key: str, ttl: float) -> str:
+    """TTL 이내의 공유 캐시 항목이 있으면 이미지 해시 반환"""
+    now = time.time()
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute("SELECT blob_hash, created_at FROM capture_cache WHERE cache_key = ?", (cache_key,))
+    result = cursor.fetchone()
+    if result and now - result[1] <= ttl:
+        cursor.execute("UPDATE capture_cache SET last_access = ? WHERE cache_key = ?", (now, cache_key))
+        conn.commit()
+    else:
+        result = None
+    conn.close()
+    return result[0] if result else None
+
+# 이력에는 기록하지 않고 공유 캐시에만 두는 대상 (캐시에서 빠지면 이미지 저장소에서도 삭제)
+CACHE_ONLY_TARGETS = ('w3c_json',)
+
+def put_cached_capture(cache_key: str, url: str, target: str, profile: str, blob_hash: str,
+                       size: int, ttl: float, max_bytes: int):
+    """공유 캐시 항목 저장 후 만료/용량 초과 항목 정리 (오래 사용되지 않은 순)
+
+    이력에서 참조하지 않는 대상(CACHE_ONLY_TARGETS)은 캐시 항목과 함께 이미지 저장소에서도 지운다.
+    """
+    now = time.time()
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    dropped = set()   # 지워진 캐시 전용 이미지 해시
+    cursor.execute("SELECT target, blob_hash FROM capture_cache WHERE cache_key = ? OR created_at < ?",
+                   (cache_key, now - ttl))
+    dropped.update(h for t, h in cursor.fetchall() if t in CACHE_ONLY_TARGETS)
+    cursor.execute("""
+        INSERT OR REPLACE INTO capture_cache 
+            (cache_key, url, target, profile, blob_hash, size, created_at, last_access)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, (cache_key, url, target, profile, blob_hash, size, now, now))
+    cursor.execute("DELETE FROM capture_cache WHERE created_at < ?", (now - ttl,))
+    
+    cursor.execute("SELECT COALESCE(SUM(size), 0) FROM capture_cache")
+    total = cursor.fetchone()[0]
+    if total > max_bytes:
+        cursor.execute("SELECT cache_key, size, target, blob_hash FROM capture_cache ORDER BY last_access ASC")
+        evicted = []
+        for key, size, evicted_target, evicted_hash in cursor.fetchall():
+            if total <= max_bytes:
+                break
+            evicted.append((key,))
+            if evicted_target in CACHE_ONLY_TARGETS:
+                dropped.add(evicted_hash)
+            total -= size
+        cursor.executemany("DELETE FROM capture_cache WHERE cache_key = ?", evicted)
+    # 남은 캐시 항목이 같은 내용을 가리키면 유지
+    cursor.executemany("""
+        DELETE FROM blobs 
+        WHERE hash = ? AND NOT EXISTS (SELECT 1 FROM capture_cache WHERE blob_hash = ?)
+    """, [(h, h) for h in dropped])
+    conn.commit()
+    conn.close()
+
+def record_capture_stat(host: str, target: str, load_ms: int, ok: bool, error: str = None):
+    """접속 1회의 로드 시간/결과 기록 (적응형 타임아웃 학습용)"""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT INTO capture_stats (host, target, load_ms, ok, error)
+        VALUES (?, ?, ?, ?, ?)
+    """, (host, target, load_ms, int(ok), error))
+    conn.commit()
+    conn.close()
+
+def get_recent_load_times(host: str, limit: int = 50) -> list:
+    """호스트의 최근 성공 접속 로드 시간 목록 (ms)"""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT load_ms FROM capture_stats 
+        WHERE host = ? AND ok = 1 
+        ORDER BY id DESC 
+        LIMIT ?
+    """, (host, limit))
+    results = [row[0] for row in cursor.fetchall()]
     conn.close()
     return results
 
+def get_previous_history(user_id: int, url: str, before_id: int, region: str = None) -> dict:
+    """같은 URL·같은 캡처 영역의 before_id 이전 완료된 검사 이력 조회 (회귀 비교용)"""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT id, screenshot_data, errors 
+        FROM history 
+        WHERE user_id = ? AND url = ? AND id < ? AND (status IS NULL OR status = 'done') 
+              AND capture_region IS ? 
+        ORDER BY id DESC 
+        LIMIT 1
+    """, (user_id, url, before_id, region))
+    result = cursor.fetchone()
+    conn.close()
+    
+    if result and result[1]:
+        return {'id': result[0], 'screenshot_data': json.loads(result[1]),
+                'errors': json.loads(result[2]) if result[2] else {}}
+    return None
+
 def get_history_by_id(history_id: int) -> dict:
     """히스토리 ID로 상세 조회"""
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     cursor.execute("""
-        SELECT id, page_title, url, screenshot_data, created_at 
+        SELECT id, page_title, url, screenshot_data, created_at, diff_data, errors, w3c_errors, w3c_warnings, 
+               status, capture_region 
         FROM history 
         WHERE id = ?
     """, (history_id,))
@@ -473,12 +1056,192 @@ def get_history_by_id(history_id: int) -> dict:
             'page_title': result[1],
             'url': result[2],
             'screenshot_data': json.loads(result[3]) if result[3] else {},
-            'created_at': result[4]
+            'created_at': result[4],
+            'diff_data': json.loads(result[5]) if result[5] else None,
+            'errors': json.loads(result[6]) if result[6] else {},
+            'w3c_errors': result[7],
+            'w3c_warnings': result[8],
+            'status': result[9] or 'done',
+            'capture_region': result[10]
         }
     return None
 
 # ============================================================================
-# 3. Playwright 자동화 (동기 방식 - 웹 배포 호환)
+# 3. 성능 트레이싱 (구간별 소요 시간 기록)
+# ============================================================================
+TRACE_ENABLED = os.environ.get('TRACE_ENABLED', '1') != '0'
+TRACE_DIR = os.environ.get('TRACE_DIR', os.path.join(DB_DIR, "traces"))
+TRACE_FILE = os.path.join(TRACE_DIR, "spans.jsonl")
+TRACE_MAX_BYTES = int(os.environ.get('TRACE_MAX_BYTES', 5 * 1024 * 1024))
+TRACE_BACKUP_COUNT = int(os.environ.get('TRACE_BACKUP_COUNT', 3))
+TRACE_DASHBOARD_MAX_SPANS = 20000
+
+# 성능 대시보드 접근 가능 사용자 (쉼표 구분, 미설정 시 없음)
+ADMIN_USERS = {u.strip() for u in os.environ.get('ADMIN_USERS', '').split(',') if u.strip()}
+
+# 타임라인에 표시할 최하위 구간 (중첩 구간 중복 합산 방지)
+TIMELINE_STAGES = [
+    'browser.launch', 'browser.new_context', 'politeness.wait', 'page.goto', 'retry.backoff', 'page.wait', 'page.resize', 'page.screenshot',
+    'admission.wait', 'persist.wait', 'persist.compress', 'db.put_blob', 'db.add_capture', 'diff', 'db.save_history',
+]
+
+# 히스토그램 구간 (ms)
+LATENCY_BUCKETS = [10, 50, 100, 250, 500, 1000, 2000, 5000, 10000, 30000]
+
+_trace_local = threading.local()
+_trace_logger_lock = threading.Lock()
+
+def is_admin(username: str) -> bool:
+    """관리자 여부 확인"""
+    return bool(username) and username in ADMIN_USERS
+
+def get_trace_logger() -> logging.Logger:
+    """span 내보내기용 로거 (회전 JSONL 파일)"""
+    logger = logging.getLogger("web_checker.trace")
+    with _trace_logger_lock:
+        if not logger.handlers:
+            Path(TRACE_DIR).mkdir(parents=True, exist_ok=True)
+            handler = RotatingFileHandler(
+                TRACE_FILE, maxBytes=TRACE_MAX_BYTES,
+                backupCount=TRACE_BACKUP_COUNT, encoding='utf-8'
+            )
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+    return logger
+
+def _export_span(span: dict):
+    """종료된 span을 JSONL 한 줄로 기록"""
+    if not TRACE_ENABLED:
+        return
+    try:
+        get_trace_logger().info(json.dumps(span, ensure_ascii=False, default=str))
+    except Exception as e:
+        print(f"Trace export error: {e}")
+
+@contextmanager
+def trace_span(name: str, **attrs):
+    """중첩 가능한 측정 구간 (with 블록 종료 시 기록)"""
+    stack = getattr(_trace_local, 'stack', None)
+    if stack is None:
+        stack = _trace_local.stack = []
+    parent = stack[-1] if stack else None
+    span = {
+        'trace_id': parent['trace_id'] if parent else uuid.uuid4().hex,
+        'span_id': uuid.uuid4().hex[:16],
+        'parent_id': parent['span_id'] if parent else None,
+        'name': name,
+        'start': time.time(),
+        'attrs': attrs,
+    }
+    stack.append(span)
+    started = time.perf_counter()
+    try:
+        yield span
+    except Exception as e:
+        span['error'] = str(e)
+        raise
+    finally:
+        span['duration_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        stack.pop()
+        _export_span(span)
+
+def current_span() -> dict:
+    """현재 스레드에서 진행 중인 가장 안쪽 span (없으면 None)"""
+    stack = getattr(_trace_local, 'stack', None)
+    return stack[-1] if stack else None
+
+@contextmanager
+def trace_context(parent: dict):
+    """다른 스레드의 span을 부모로 이어받기 (작업자 스레드용)"""
+    if parent is None:
+        yield
+        return
+    stack = getattr(_trace_local, 'stack', None)
+    if stack is None:
+        stack = _trace_local.stack = []
+    stack.append(parent)
+    try:
+        yield
+    finally:
+        stack.pop()
+
+def load_spans(limit: int = TRACE_DASHBOARD_MAX_SPANS) -> list:
+    """회전된 파일까지 포함해 최근 span 로드 (오래된 순)"""
+    files = [f"{TRACE_FILE}.{i}" for i in range(TRACE_BACKUP_COUNT, 0, -1)] + [TRACE_FILE]
+    spans = deque(maxlen=limit)
+    for path in files:
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    spans.append(json.loads(line))
+                except ValueError:
+                    continue
+    return list(spans)
+
+def percentile(sorted_values: list, q: float) -> float:
+    """정렬된 값 목록의 q 분위수 (최근접 순위)"""
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[idx]
+
+def summarize_spans(spans: list) -> dict:
+    """구간 이름별 지연 시간 통계 및 히스토그램"""
+    durations = defaultdict(list)
+    for span in spans:
+        durations[span['name']].append(span.get('duration_ms', 0))
+    
+    labels = [f"<{b}" for b in LATENCY_BUCKETS] + [f"≥{LATENCY_BUCKETS[-1]}"]
+    summary = {}
+    for name, values in durations.items():
+        values.sort()
+        histogram = dict.fromkeys(labels, 0)
+        for v in values:
+            for bound, label in zip(LATENCY_BUCKETS, labels):
+                if v < bound:
+                    histogram[label] += 1
+                    break
+            else:
+                histogram[labels[-1]] += 1
+        summary[name] = {
+            'count': len(values),
+            'p50': percentile(values, 0.5),
+            'p95': percentile(values, 0.95),
+            'max': values[-1],
+            'histogram': histogram,
+        }
+    return summary
+
+def batch_timeline(spans: list, last_n: int = 10) -> list:
+    """최근 배치(batch span)별 구간 소요 시간 합계"""
+    by_trace = defaultdict(list)
+    for span in spans:
+        by_trace[span['trace_id']].append(span)
+    
+    batches = []
+    for trace_spans in by_trace.values():
+        root = next((s for s in trace_spans if s['name'] == 'batch' and not s.get('parent_id')), None)
+        if not root:
+            continue
+        stages = defaultdict(float)
+        for s in trace_spans:
+            if s['name'] in TIMELINE_STAGES:
+                stages[s['name']] += s.get('duration_ms', 0)
+        batches.append({
+            'start': root['start'],
+            'duration_ms': root.get('duration_ms', 0),
+            'attrs': root.get('attrs', {}),
+            'stages': dict(stages),
+        })
+    batches.sort(key=lambda b: b['start'])
+    return batches[-last_n:]
+
+# ============================================================================
+# 4. Playwright 자동화 (동기 방식 - 웹 배포 호환)
 # ============================================================================
 
 # User-Agent 문자열
@@ -488,55 +1251,884 @@ USER_AGENTS = {
     'whale': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Whale/3.24.223.21 Safari/537.36',
 }
 
-def capture_w3c_validation(page, url: str) -> bytes:
-    """W3C 웹 표준 검사 결과 캡처"""
+# 디바이스 프로필 (desktop은 브라우저 컨텍스트 기본값)
+# Chromium은 CDP로 뷰포트/DPR/모바일/User-Agent를 같은 페이지에서 바꿀 수 있고,
+# WebKit은 컨텍스트 생성 후 뷰포트 크기만 바꿀 수 있다.
+DEVICE_PROFILES = {
+    'desktop': {
+        'label': '데스크톱', 'width': 1920, 'height': 1080,
+        'device_scale_factor': 1, 'is_mobile': False, 'user_agents': {},
+    },
+    'tablet': {
+        'label': '태블릿', 'width': 820, 'height': 1180,
+        'device_scale_factor': 2, 'is_mobile': True,
+        'user_agents': {
+            'chrome': 'Mozilla/5.0 (Linux; Android 14; SM-X710) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            'edge': 'Mozilla/5.0 (Linux; Android 14; SM-X710) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 EdgA/120.0.0.0',
+            'whale': 'Mozilla/5.0 (Linux; Android 14; SM-X710) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Whale/3.24.223.21 Safari/537.36',
+        },
+    },
+    'mobile': {
+        'label': '모바일', 'width': 390, 'height': 844,
+        'device_scale_factor': 3, 'is_mobile': True,
+        'user_agents': {
+            'chrome': 'Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Mobile Safari/537.36',
+            'edge': 'Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Mobile Safari/537.36 EdgA/120.0.0.0',
+            'whale': 'Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Whale/3.24.223.21 Mobile Safari/537.36',
+        },
+    },
+}
+PROFILE_SETTLE_MS = 500  # 뷰포트 변경 후 레이아웃 안정화 대기
+
+def capture_key(browser_key: str, profile: str = 'desktop') -> str:
+    """screenshot_data 키 (데스크톱은 브라우저명, 그 외는 '브라우저@프로필')"""
+    return browser_key if profile == 'desktop' else f"{browser_key}@{profile}"
+
+# 캡처 영역 지정: CSS 선택자 또는 "x,y,너비,높이" (문서 기준 CSS px)
+CLIP_PATTERN = re.compile(r'^\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*$')
+# W3C 검사 결과에서 캡처할 영역 (비우면 전체 페이지)
+W3C_CAPTURE_REGION = os.environ.get('W3C_CAPTURE_REGION', '').strip()
+
+def parse_capture_region(spec: str) -> dict:
+    """캡처 영역 문자열 해석 (빈 값이면 None, 크기가 0인 사각형은 ValueError)"""
+    spec = (spec or '').strip()
+    if not spec:
+        return None
+    match = CLIP_PATTERN.match(spec)
+    if match:
+        x, y, width, height = map(int, match.groups())
+        if not width or not height:
+            raise ValueError("캡처 영역의 너비와 높이는 0보다 커야 합니다.")
+        return {'clip': {'x': x, 'y': y, 'width': width, 'height': height}}
+    return {'selector': spec}
+
+def _region_box(page, region: dict) -> dict:
+    """캡처 영역을 문서 기준 사각형으로 변환 (선택자와 맞는 보이는 요소가 없으면 None)"""
+    if 'clip' in region:
+        return region['clip']
     try:
-        validator_url = f"https://validator.w3.org/nu/?doc={url}"
-        page.goto(validator_url, wait_until='networkidle', timeout=60000)
-        page.wait_for_timeout(3000)
-        screenshot = page.screenshot(full_page=True)
-        return screenshot
-    except Exception as e:
-        st.warning(f"W3C 검사 오류: {str(e)}")
+        element = page.query_selector(region['selector'])
+        box = element.bounding_box() if element else None
+    except Exception:
+        # 잘못된 선택자
+        return None
+    if not box or box['width'] < 1 or box['height'] < 1:
         return None
+    scroll_x, scroll_y = page.evaluate("() => [window.scrollX, window.scrollY]")
+    return {'x': box['x'] + scroll_x, 'y': box['y'] + scroll_y, 'width': box['width'], 'height': box['height']}
+
+def capture_viewport(page, cdp=None, region: dict = None, span: dict = None, notices: list = None) -> bytes:
+    """현재 뷰포트 또는 지정 영역만 캡처 (영역을 찾지 못하면 뷰포트 전체, 그 사유는 notices에 추가)"""
+    box = _region_box(page, region) if region else None
+    if span is not None and region:
+        span['attrs']['region'] = ('clip' if 'clip' in region else 'selector') if box else 'fallback'
+    if region and not box and notices is not None:
+        notices.append(f"'{region.get('selector')}'와 맞는 요소가 없어 화면 전체를 캡처함")
+    if cdp:
+        # Playwright가 모르는 DPR 변경이 반영되도록 CDP로 직접 캡처
+        params = {'format': 'png'}
+        if box:
+            params.update(clip=dict(box, scale=1), captureBeyondViewport=True)
+        return base64.b64decode(cdp.send('Page.captureScreenshot', params)['data'])
+    if box:
+        # full_page 기준 좌표로 영역만 렌더링
+        return page.screenshot(clip=box, full_page=True)
+    return page.screenshot(full_page=False)
+
+def _capture_profile(page, cdp, browser_key: str, profile_name: str, region: dict = None,
+                     notices: list = None) -> bytes:
+    """이미 로드된 페이지를 프로필 뷰포트로 바꿔 다시 캡처 (재접속 없음)"""
+    profile = DEVICE_PROFILES[profile_name]
+    with trace_span('page.resize', browser=browser_key, profile=profile_name):
+        if cdp:
+            cdp.send('Emulation.setDeviceMetricsOverride', {
+                'width': profile['width'], 'height': profile['height'],
+                'deviceScaleFactor': profile['device_scale_factor'], 'mobile': profile['is_mobile'],
+            })
+            cdp.send('Emulation.setTouchEmulationEnabled', {'enabled': profile['is_mobile']})
+            # 이미 받은 문서에는 영향이 없고 이후 요청/스크립트에만 적용됨
+            user_agent = profile['user_agents'].get(browser_key)
+            if user_agent:
+                cdp.send('Emulation.setUserAgentOverride', {'userAgent': user_agent})
+        else:
+            page.set_viewport_size({'width': profile['width'], 'height': profile['height']})
+        page.wait_for_timeout(PROFILE_SETTLE_MS)
+    
+    with trace_span('page.screenshot', browser=browser_key, profile=profile_name) as span:
+        screenshot = capture_viewport(page, cdp, region, span, notices)
+        span['attrs']['bytes'] = len(screenshot)
+    return screenshot
+
+# 전체 페이지 캡처 방식: 'tiled' (구간 분할 합성) 또는 'full' (page.screenshot full_page)
+FULL_PAGE_CAPTURE_MODE = os.environ.get('FULL_PAGE_CAPTURE_MODE', 'tiled')
+# 합성 이미지 최대 높이 (px, 축소 후 기준) - 초과 구간은 잘라냄
+TILED_MAX_HEIGHT = int(os.environ.get('TILED_MAX_HEIGHT', 16000))
+# 타일 축소 비율 (1.0 = 원본)
+TILED_SCALE = float(os.environ.get('TILED_SCALE', 1.0))
+
+class StreamingPngWriter:
+    """RGB 행을 받는 대로 압축해 붙이는 PNG 작성기 (합성 캔버스를 메모리에 두지 않음)"""
+    
+    def __init__(self, width: int, height: int, level: int = 6):
+        self.width = width
+        self.height = height
+        self.rows = 0
+        self._buffer = io.BytesIO()
+        self._compressor = zlib.compressobj(level)
+        self._buffer.write(b'\x89PNG\r\n\x1a\n')
+        self._chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+    
+    def _chunk(self, kind: bytes, data: bytes):
+        self._buffer.write(struct.pack('>I', len(data)) + kind + data)
+        self._buffer.write(struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff))
+    
+    def _write_rows(self, raw: bytes, rows: int):
+        stride = self.width * 3
+        data = self._compressor.compress(
+            b''.join(b'\x00' + raw[i * stride:(i + 1) * stride] for i in range(rows))
+        )
+        if data:
+            self._chunk(b'IDAT', data)
+        self.rows += rows
+    
+    def write(self, image):
+        """너비가 같은 RGB 이미지의 행을 이어 붙임 (height를 넘는 행은 버림)"""
+        rows = min(image.height, self.height - self.rows)
+        if rows > 0:
+            self._write_rows(image.tobytes(), rows)
+    
+    def close(self) -> bytes:
+        """남은 행을 흰색으로 채우고 PNG bytes 반환"""
+        blank = b'\xff' * (self.width * 3)
+        while self.rows < self.height:
+            rows = min(256, self.height - self.rows)
+            self._write_rows(blank * rows, rows)
+        self._chunk(b'IDAT', self._compressor.flush())
+        self._chunk(b'IEND', b'')
+        return self._buffer.getvalue()
+
+def capture_tiled(page, max_height: int = TILED_MAX_HEIGHT, scale: float = TILED_SCALE,
+                  notices: list = None) -> bytes:
+    """뷰포트 높이 단위로 스크롤하며 캡처 후 하나의 PNG로 합성
+    
+    타일을 한 장씩 바로 압축해 붙이므로 최대 메모리 사용량은 타일 1장과 압축 결과 정도다.
+    max_height를 넘는 페이지는 잘리며, 그 사유를 notices에 추가한다.
+    """
+    viewport = page.viewport_size or {'width': 1920, 'height': 1080}
+    width, tile_height = viewport['width'], viewport['height']
+    total_height = page.evaluate(
+        "() => Math.max(document.documentElement.scrollHeight, document.body ? document.body.scrollHeight : 0)"
+    )
+    capture_height = max(1, min(total_height, int(max_height / scale)))
+    out_width = max(1, round(width * scale))
+    writer = StreamingPngWriter(out_width, max(1, round(capture_height * scale)))
+    
+    y = 0
+    tiles = 0
+    while y < capture_height:
+        page.evaluate("y => window.scrollTo(0, y)", y)
+        # 페이지 끝에서는 스크롤이 제한되므로 실제 위치 기준으로 잘라냄
+        scroll_y = page.evaluate("() => window.scrollY")
+        with trace_span('page.screenshot.tile', index=tiles):
+            png = page.screenshot(full_page=False)
+        tile = Image.open(io.BytesIO(png)).convert('RGB')
+        del png
+        
+        ratio = tile.width / width  # deviceScaleFactor 보정
+        offset = y - scroll_y
+        height = min(tile_height - offset, capture_height - y)
+        if height <= 0:
+            break
+        tile = tile.crop((0, round(offset * ratio), tile.width, round((offset + height) * ratio)))
+        
+        top = round(y * scale)
+        bottom = round((y + height) * scale)
+        if tile.size != (out_width, bottom - top) and bottom > top:
+            tile = tile.resize((out_width, bottom - top), Image.Resampling.BILINEAR)
+        writer.write(tile)
+        tile.close()
+        
+        y += height
+        tiles += 1
+    
+    page.evaluate("() => window.scrollTo(0, 0)")
+    png = writer.close()
+    
+    truncated = total_height > capture_height
+    if truncated and notices is not None:
+        notices.append(f"페이지 높이 {total_height}px 중 위쪽 {capture_height}px만 캡처됨 (TILED_MAX_HEIGHT 초과)")
+    span = current_span()
+    if span:
+        span['attrs'].update(tiles=tiles, page_height=total_height, truncated=truncated)
+    return png
+
+def capture_full_page(page, notices: list = None) -> bytes:
+    """전체 페이지 캡처 (설정에 따라 타일 합성 또는 단일 캡처, 잘린 경우 notices에 사유 추가)"""
+    if FULL_PAGE_CAPTURE_MODE == 'tiled' and PIL_AVAILABLE:
+        return capture_tiled(page, notices=notices)
+    return page.screenshot(full_page=True)
+
+# 호스트별 예의(politeness) 설정: 동시 접속 수와 요청 시작 간격
+HOST_MAX_CONCURRENCY = int(os.environ.get('HOST_MAX_CONCURRENCY', 2))
+HOST_MIN_INTERVAL = float(os.environ.get('HOST_MIN_INTERVAL', 1.0))  # 초
+# 배치 동안 유지할 (호스트, 브라우저) 컨텍스트 최대 수
+SESSION_MAX_CONTEXTS = int(os.environ.get('SESSION_MAX_CONTEXTS', 16))
+VALIDATOR_HOST = 'validator.w3.org'
+W3C_JSON_MAX_BYTES = 10 * 1024 * 1024  # 검사기 JSON 출력 최대 크기
+W3C_EXTRACT_MAX_CHARS = 500            # 메시지별 저장할 소스 발췌 길이
+CHROMIUM_ARGS = ['--no-sandbox', '--disable-setuid-sandbox', '--disable-dev-shm-usage']
+
+class HostPoliteness:
+    """호스트별 동시 접속 수와 요청 간격 제한 (프로세스 전역, 세션 간 공유)"""
+    
+    def __init__(self, max_concurrency: int, min_interval: float):
+        self.max_concurrency = max_concurrency
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._semaphores = {}
+        self._next_start = {}
+    
+    @contextmanager
+    def slot(self, host: str):
+        """host에 대한 요청 1건 실행 권한 (필요 시 대기)"""
+        with self._lock:
+            semaphore = self._semaphores.setdefault(host, threading.BoundedSemaphore(self.max_concurrency))
+        with trace_span('politeness.wait', host=host):
+            semaphore.acquire()
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next_start.get(host, 0.0))
+                self._next_start[host] = start + self.min_interval
+            if start > now:
+                time.sleep(start - now)
+        try:
+            yield
+        finally:
+            semaphore.release()
 
-def capture_browser(playwright, url: str, browser_name: str) -> bytes:
-    """브라우저 호환성 캡처"""
-    try:
-        # Safari는 WebKit 사용
-        if browser_name.lower() == 'safari':
-            browser = playwright.webkit.launch(
-                headless=True
-            )
-            context = browser.new_context(
-                viewport={'width': 1920, 'height': 1080}
-            )
+@st.cache_resource
+def get_host_politeness() -> HostPoliteness:
+    """프로세스 전역 HostPoliteness (Streamlit 재실행 간 유지)"""
+    return HostPoliteness(HOST_MAX_CONCURRENCY, HOST_MIN_INTERVAL)
+
+def interleave_by_host(targets: list) -> list:
+    """같은 호스트가 연달아 오지 않도록 호스트별 라운드로빈으로 재정렬
+    
+    한 호스트의 요청 간격을 기다리는 동안 다른 호스트 작업이 진행된다.
+    """
+    groups = OrderedDict()
+    for target in targets:
+        # (제목, URL, ...) 형태면 추가 항목은 그대로 유지
+        groups.setdefault(urlsplit(target[1]).hostname, deque()).append(target)
+    ordered = []
+    while groups:
+        for host in list(groups):
+            ordered.append(groups[host].popleft())
+            if not groups[host]:
+                del groups[host]
+    return ordered
+
+class BrowserSession:
+    """배치 동안 브라우저와 (호스트, 브라우저)별 컨텍스트를 유지
+    
+    같은 호스트의 다음 페이지는 기존 컨텍스트에서 열리므로 TLS 연결과 HTTP 캐시가 재사용된다.
+    """
+    
+    def __init__(self, playwright, max_contexts: int = SESSION_MAX_CONTEXTS):
+        self.playwright = playwright
+        self.max_contexts = max_contexts
+        self.browsers = {}
+        self.contexts = OrderedDict()
+    
+    def _browser(self, engine: str):
+        if engine not in self.browsers:
+            with trace_span('browser.launch', engine=engine):
+                if engine == 'webkit':
+                    self.browsers[engine] = self.playwright.webkit.launch(headless=True)
+                else:
+                    self.browsers[engine] = self.playwright.chromium.launch(headless=True, args=CHROMIUM_ARGS)
+        return self.browsers[engine]
+    
+    def new_page(self, target: str, host: str):
+        """target('w3c', 'chrome', ..., 'safari')용 컨텍스트에서 새 페이지 생성"""
+        key = (host, target)
+        context = self.contexts.get(key)
+        if context is not None:
+            self.contexts.move_to_end(key)
         else:
-            # Chrome, Edge, Whale은 Chromium 기반 + User-Agent
-            browser = playwright.chromium.launch(
-                headless=True,
-                args=['--no-sandbox', '--disable-setuid-sandbox', '--disable-dev-shm-usage']
-            )
-            user_agent = USER_AGENTS.get(browser_name.lower(), USER_AGENTS['chrome'])
-            context = browser.new_context(
-                viewport={'width': 1920, 'height': 1080},
-                user_agent=user_agent
-            )
+            desktop = DEVICE_PROFILES['desktop']
+            options = {'viewport': {'width': desktop['width'], 'height': desktop['height']}}
+            if target in USER_AGENTS:
+                options['user_agent'] = USER_AGENTS[target]
+            elif target not in ('w3c', 'safari'):
+                options['user_agent'] = USER_AGENTS['chrome']
+            engine = 'webkit' if target == 'safari' else 'chromium'
+            with trace_span('browser.new_context', target=target, host=host):
+                context = self._browser(engine).new_context(**options)
+            self.contexts[key] = context
+            while len(self.contexts) > self.max_contexts:
+                _, oldest = self.contexts.popitem(last=False)
+                oldest.close()
+        return context.new_page()
+    
+    def close(self):
+        for context in self.contexts.values():
+            try:
+                context.close()
+            except Exception:
+                pass
+        for browser in self.browsers.values():
+            try:
+                browser.close()
+            except Exception:
+                pass
+        self.contexts.clear()
+        self.browsers.clear()
+
+@contextmanager
+def open_browser_session():
+    """Playwright 시작 후 BrowserSession 제공 (종료 시 모두 정리)"""
+    with sync_playwright() as playwright:
+        session = BrowserSession(playwright)
+        try:
+            yield session
+        finally:
+            session.close()
+
+# 전역 검사 허용 제어: 동시에 브라우저 세션을 여는 배치 수 제한 (세션당 페이지는 한 번에 하나)
+CAPTURE_MAX_SESSIONS = int(os.environ.get('CAPTURE_MAX_SESSIONS', 2))
+CAPTURE_MAX_SESSIONS_PER_USER = int(os.environ.get('CAPTURE_MAX_SESSIONS_PER_USER', 1))
+CAPTURE_ETA_DEFAULT = 60.0  # URL 1개 검사 예상 시간 (초, 측정값이 쌓이기 전)
+
+class CaptureScheduler:
+    """브라우저 세션 허용 대기열 (사용자별 공정 분배, 모든 세션 공유)"""
+    
+    def __init__(self, max_sessions: int, max_per_user: int):
+        self.max_sessions = max_sessions
+        self.max_per_user = max_per_user
+        self._cond = threading.Condition()
+        self._waiting = []                  # 대기 중 티켓 (요청 순)
+        self._active = defaultdict(int)     # 사용자별 실행 중 세션 수
+        self._last_grant = {}               # 사용자별 마지막 허용 시각
+        self._next_seq = 0
+        self._avg_check = CAPTURE_ETA_DEFAULT
+    
+    def _order(self) -> list:
+        """허용 예정 순서 (사용자별로 한 건씩 번갈아, 최근에 덜 받은 사용자 우선)"""
+        per_user = defaultdict(list)
+        for ticket in self._waiting:
+            per_user[ticket['owner']].append(ticket)
+        order = []
+        for owner, tickets in per_user.items():
+            for rank, ticket in enumerate(tickets):
+                order.append((rank + self._active[owner], self._last_grant.get(owner, 0), ticket['seq'], ticket))
+        order.sort(key=lambda item: item[:3])
+        return [item[3] for item in order]
+    
+    def _dispatch(self):
+        running = sum(self._active.values())
+        for ticket in self._order():
+            if running >= self.max_sessions:
+                break
+            if self._active[ticket['owner']] >= self.max_per_user:
+                continue
+            self._waiting.remove(ticket)
+            self._active[ticket['owner']] += 1
+            self._last_grant[ticket['owner']] = time.time()
+            ticket['granted'] = True
+            running += 1
+        self._cond.notify_all()
+    
+    def status(self, ticket: dict) -> tuple:
+        """대기 순번(1부터)과 예상 대기 시간(초)"""
+        with self._cond:
+            order = self._order()
+            position = order.index(ticket) + 1 if ticket in order else 0
+            rounds = -(-position // max(1, self.max_sessions))
+            return position, rounds * self._avg_check
+    
+    def acquire(self, owner, on_wait=None) -> dict:
+        """세션 자리 확보까지 대기 (on_wait(순번, 예상 대기 초)로 진행 상황 전달)"""
+        with self._cond:
+            ticket = {'owner': owner, 'seq': self._next_seq, 'granted': False}
+            self._next_seq += 1
+            self._waiting.append(ticket)
+            self._dispatch()
+        try:
+            while not ticket['granted']:
+                if on_wait:
+                    on_wait(*self.status(ticket))
+                with self._cond:
+                    if not ticket['granted']:
+                        self._cond.wait(timeout=1.0)
+        except BaseException:
+            # 대기 중 세션이 중단되면 티켓 회수
+            with self._cond:
+                if ticket['granted']:
+                    self._active[owner] -= 1
+                else:
+                    self._waiting.remove(ticket)
+                self._dispatch()
+            raise
+        return ticket
+    
+    def release(self, ticket: dict):
+        """세션 자리 반납"""
+        with self._cond:
+            self._active[ticket['owner']] -= 1
+            self._dispatch()
+    
+    def should_yield(self, ticket: dict) -> bool:
+        """자리를 내놓으면 다른 사용자의 대기 티켓이 실제로 허용되는지 (아무도 못 받으면 양보하지 않음)"""
+        with self._cond:
+            # 이 자리를 반납했다고 가정하고 _dispatch가 고를 첫 티켓 확인
+            self._active[ticket['owner']] -= 1
+            try:
+                for waiting in self._order():
+                    if self._active[waiting['owner']] < self.max_per_user:
+                        return waiting['owner'] != ticket['owner']
+                return False
+            finally:
+                self._active[ticket['owner']] += 1
+    
+    def record_check(self, seconds: float):
+        """URL 1개 검사 시간 반영 (지수 이동 평균, 예상 대기 시간 계산용)"""
+        with self._cond:
+            self._avg_check = 0.8 * self._avg_check + 0.2 * seconds
+
+@st.cache_resource
+def get_capture_scheduler() -> CaptureScheduler:
+    """프로세스 전역 검사 허용 대기열"""
+    return CaptureScheduler(CAPTURE_MAX_SESSIONS, CAPTURE_MAX_SESSIONS_PER_USER)
+
+class AdmittedSession:
+    """대기열 자리를 받은 동안만 브라우저 세션 유지 (다른 사용자가 기다리면 URL 사이에 양보)"""
+    
+    def __init__(self, owner, on_wait=None):
+        self.owner = owner
+        self.on_wait = on_wait  # on_wait(순번, 예상 대기 초), 자리를 받으면 (0, 0)
+        self._scheduler = get_capture_scheduler()
+        self._ticket = None
+        self._stack = ExitStack()
+        self._session = None
+    
+    def session(self) -> BrowserSession:
+        """자리를 받아 브라우저 세션 반환 (이미 받았으면 그대로)"""
+        if self._session is None:
+            with trace_span('admission.wait', owner=str(self.owner)):
+                self._ticket = self._scheduler.acquire(self.owner, self.on_wait)
+            if self.on_wait:
+                self.on_wait(0, 0.0)
+            self._session = self._stack.enter_context(open_browser_session())
+        return self._session
+    
+    def checkpoint(self, seconds: float):
+        """URL 1개 검사 후 호출 (검사 시간 기록, 필요 시 세션을 닫고 자리 양보)"""
+        self._scheduler.record_check(seconds)
+        if self._ticket and self._scheduler.should_yield(self._ticket):
+            self.close()
+    
+    def close(self):
+        self._stack.close()
+        self._session = None
+        if self._ticket:
+            self._scheduler.release(self._ticket)
+            self._ticket = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+# 적응형 타임아웃: 최근 로드 시간 p95 x 배수, 최소/최대값으로 제한
+TIMEOUT_MIN_MS = int(os.environ.get('TIMEOUT_MIN_MS', 15000))
+TIMEOUT_MAX_MS = int(os.environ.get('TIMEOUT_MAX_MS', 60000))
+TIMEOUT_P95_MULTIPLIER = 3.0
+TIMEOUT_MIN_SAMPLES = 5
+# 일시적 오류 재시도
+CAPTURE_MAX_RETRIES = int(os.environ.get('CAPTURE_MAX_RETRIES', 2))
+RETRY_BACKOFF_BASE = 1.0  # 초 (시도마다 2배 + 지터)
+# 서킷 브레이커: 연속 실패 횟수(재시도까지 모두 실패한 접속 단위)와 차단 유지 시간
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('CIRCUIT_FAILURE_THRESHOLD', 2))
+CIRCUIT_COOLDOWN = float(os.environ.get('CIRCUIT_COOLDOWN', 300))  # 초
+
+# 재시도할 만한 네트워크 오류 (타임아웃은 이미 제한 시간을 다 기다렸으므로 재시도하지 않음)
+TRANSIENT_ERRORS = (
+    'ERR_CONNECTION_RESET', 'ERR_CONNECTION_CLOSED',
+    'ERR_CONNECTION_REFUSED', 'ERR_EMPTY_RESPONSE', 'ERR_NETWORK_CHANGED',
+    'ERR_HTTP2_PROTOCOL_ERROR', 'ERR_SOCKET_NOT_CONNECTED', 'ERR_ABORTED',
+)
+
+class CaptureError(Exception):
+    """캡처 실패 (사유는 이력에 기록됨)"""
+
+class CircuitBreaker:
+    """호스트별 연속 실패 시 일정 시간 동안 즉시 실패 처리 (프로세스 전역)"""
+    
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures = {}
+        self._opened_at = {}
+    
+    def allow(self, host: str) -> bool:
+        """요청 허용 여부 (차단 시간이 지나면 시험 요청 1건 허용)"""
+        with self._lock:
+            opened_at = self._opened_at.get(host)
+            if opened_at is None:
+                return True
+            if time.monotonic() - opened_at >= self.cooldown:
+                # half-open: 시험 요청 동안 다른 요청은 계속 차단
+                self._opened_at[host] = time.monotonic()
+                return True
+            return False
+    
+    def record_success(self, host: str):
+        with self._lock:
+            self._failures.pop(host, None)
+            self._opened_at.pop(host, None)
+    
+    def record_failure(self, host: str):
+        with self._lock:
+            self._failures[host] = self._failures.get(host, 0) + 1
+            if self._failures[host] >= self.threshold:
+                self._opened_at[host] = time.monotonic()
+
+@st.cache_resource
+def get_circuit_breaker() -> CircuitBreaker:
+    """프로세스 전역 CircuitBreaker (Streamlit 재실행 간 유지)"""
+    return CircuitBreaker(CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_COOLDOWN)
+
+def adaptive_timeout(host: str) -> int:
+    """호스트의 과거 로드 시간 분포로 goto 타임아웃(ms) 결정"""
+    samples = sorted(get_recent_load_times(host))
+    if len(samples) < TIMEOUT_MIN_SAMPLES:
+        return TIMEOUT_MAX_MS
+    timeout = int(percentile(samples, 0.95) * TIMEOUT_P95_MULTIPLIER)
+    return max(TIMEOUT_MIN_MS, min(TIMEOUT_MAX_MS, timeout))
+
+def error_reason(error: Exception) -> str:
+    """예외 메시지의 첫 줄 (이력/로그 표시용)"""
+    lines = str(error).strip().splitlines()
+    return lines[0] if lines else type(error).__name__
+
+def is_transient_error(error: Exception) -> bool:
+    message = str(error)
+    return any(code in message for code in TRANSIENT_ERRORS)
+
+def navigate(page, url: str, host: str, target: str):
+    """적응형 타임아웃, 백오프 재시도, 서킷 브레이커를 적용한 page.goto"""
+    breaker = get_circuit_breaker()
+    if not breaker.allow(host):
+        raise CaptureError(f"{host} 연속 실패로 일시 차단됨 (서킷 오픈)")
+    
+    timeout = adaptive_timeout(host)
+    for attempt in range(CAPTURE_MAX_RETRIES + 1):
+        with get_host_politeness().slot(host):
+            started = time.perf_counter()
+            try:
+                with trace_span('page.goto', browser=target, attempt=attempt, timeout_ms=timeout):
+                    page.goto(url, wait_until='networkidle', timeout=timeout)
+            except Exception as e:
+                error = e
+            else:
+                error = None
+            elapsed_ms = int((time.perf_counter() - started) * 1000)
         
-        page = context.new_page()
-        page.goto(url, wait_until='networkidle', timeout=60000)
-        page.wait_for_timeout(2000)
-        screenshot = page.screenshot(full_page=False)
-        browser.close()
-        return screenshot
-    except Exception as e:
-        st.warning(f"{browser_name} 캡처 오류: {str(e)}")
+        reason = error_reason(error) if error else None
+        record_capture_stat(host, target, elapsed_ms, error is None, reason)
+        if error is None:
+            breaker.record_success(host)
+            return
+        # 재시도까지 모두 실패한 접속 1건을 연속 실패 1회로 집계
+        if attempt >= CAPTURE_MAX_RETRIES or not is_transient_error(error):
+            breaker.record_failure(host)
+            raise CaptureError(reason) from error
+        
+        delay = RETRY_BACKOFF_BASE * (2 ** attempt) * random.uniform(0.5, 1.5)
+        with trace_span('retry.backoff', host=host, attempt=attempt):
+            time.sleep(delay)
+
+# 검사기 결과 화면의 메시지 목록을 Nu JSON 출력과 같은 형태로 읽는 스크립트
+W3C_RESULTS_SCRIPT = """() => {
+    const results = document.querySelector('#results');
+    if (!results && !document.querySelector('p.success')) return null;
+    const items = results ? Array.from(results.querySelectorAll('ol > li')) : [];
+    return items.map(li => {
+        const text = sel => { const el = li.querySelector(sel); return el ? el.textContent : null; };
+        const line = text('.last-line') || text('.first-line');
+        return {
+            type: li.classList.contains('error') ? 'error'
+                : li.classList.contains('info') ? 'info' : 'non-document-error',
+            subType: li.classList.contains('warning') ? 'warning' : null,
+            lastLine: line ? parseInt(line, 10) : null,
+            message: text('p > span'),
+            extract: text('.extract code'),
+        };
+    });
+}"""
+
+def read_w3c_results(page) -> bytes:
+    """이미 열린 검사기 결과 화면에서 메시지 목록을 Nu JSON 형식으로 추출 (결과 화면이 아니면 None)"""
+    try:
+        items = page.evaluate(W3C_RESULTS_SCRIPT)
+    except Exception:
         return None
+    if items is None:
+        return None
+    return json.dumps({'messages': items}, ensure_ascii=False).encode('utf-8')
+
+def capture_w3c_validation(page, url: str, notices: list = None) -> tuple:
+    """W3C 웹 표준 검사 결과 캡처 → (스크린샷, 결과 JSON 또는 None) (W3C_CAPTURE_REGION 지정 시 해당 영역만, 실패 시 예외)"""
+    validator_url = f"https://{VALIDATOR_HOST}/nu/?doc={url}"
+    navigate(page, validator_url, VALIDATOR_HOST, 'w3c')
+    with trace_span('page.wait', browser='w3c'):
+        page.wait_for_timeout(3000)
+    region = parse_capture_region(W3C_CAPTURE_REGION)
+    box = _region_box(page, region) if region else None
+    with trace_span('page.screenshot', browser='w3c', full_page=not box,
+                    mode='region' if box else FULL_PAGE_CAPTURE_MODE) as span:
+        screenshot = page.screenshot(clip=box, full_page=True) if box else capture_full_page(page, notices)
+        span['attrs']['bytes'] = len(screenshot)
+    return screenshot, read_w3c_results(page)
+
+def parse_w3c_messages(body: bytes) -> list:
+    """Nu 검사기 JSON 출력을 메시지 목록으로 변환 (error / warning / info)"""
+    messages = []
+    for item in json.loads(body.decode('utf-8')).get('messages', []):
+        message_type = item.get('type')
+        if message_type == 'info':
+            message_type = 'warning' if item.get('subType') == 'warning' else 'info'
+        elif message_type != 'error':
+            # 검사기 자체 오류(non-document-error)는 페이지 오류로 세지 않음
+            message_type = 'info'
+        extract = item.get('extract')
+        messages.append({
+            'type': message_type,
+            'line': item.get('lastLine', item.get('firstLine')),
+            'extract': extract[:W3C_EXTRACT_MAX_CHARS] if extract else None,
+            'message': item.get('message'),
+        })
+    return messages
+
+def fetch_w3c_json(url: str) -> bytes:
+    """W3C 검사 결과 JSON 원문 조회 (호스트 예절/서킷 브레이커 적용, 실패 시 예외)"""
+    breaker = get_circuit_breaker()
+    if not breaker.allow(VALIDATOR_HOST):
+        raise CaptureError(f"{VALIDATOR_HOST} 일시 차단 (연속 실패)")
+    validator_url = f"https://{VALIDATOR_HOST}/nu/?doc={quote(url, safe='')}&out=json"
+    with trace_span('w3c.json', url=url) as span:
+        try:
+            body, _, _ = _fetch(validator_url, W3C_JSON_MAX_BYTES, adaptive_timeout(VALIDATOR_HOST) / 1000)
+        except Exception:
+            breaker.record_failure(VALIDATOR_HOST)
+            raise
+        breaker.record_success(VALIDATOR_HOST)
+        span['attrs']['bytes'] = len(body)
+    return body
+
+def capture_browser(session: BrowserSession, url: str, browser_name: str, profiles: list = None,
+                    region: dict = None, fallbacks: dict = None) -> dict:
+    """브라우저 호환성 캡처 (한 번 접속한 페이지에서 프로필별로 캡처, 실패 시 예외)
+
+    region 지정 시 해당 영역만 캡처하고, 영역을 못 찾아 전체를 찍은 프로필은 fallbacks에 사유를 기록한다.
+    """
+    profiles = profiles or ['desktop']
+    browser_key = browser_name.lower()
+    host = urlsplit(url).hostname
+    page = None
+    try:
+        # Safari는 WebKit, Chrome/Edge/Whale은 Chromium 기반 + User-Agent
+        page = session.new_page(browser_key, host)
+        navigate(page, url, host, browser_key)
+        with trace_span('page.wait', browser=browser_name):
+            page.wait_for_timeout(2000)
+        
+        screenshots = {}
+        if 'desktop' in profiles:
+            with trace_span('page.screenshot', browser=browser_name, profile='desktop') as span:
+                notices = []
+                screenshots['desktop'] = capture_viewport(page, region=region, span=span, notices=notices)
+                span['attrs']['bytes'] = len(screenshots['desktop'])
+            if notices and fallbacks is not None:
+                fallbacks['desktop'] = notices[0]
+        
+        other_profiles = [p for p in profiles if p != 'desktop' and p in DEVICE_PROFILES]
+        if other_profiles:
+            cdp = page.context.new_cdp_session(page) if browser_key != 'safari' else None
+            for profile_name in other_profiles:
+                notices = []
+                screenshots[profile_name] = _capture_profile(page, cdp, browser_key, profile_name, region, notices)
+                if notices and fallbacks is not None:
+                    fallbacks[profile_name] = notices[0]
+        
+        return screenshots
+    finally:
+        # 컨텍스트는 같은 호스트의 다음 페이지를 위해 유지하고 페이지만 닫음
+        if page is not None:
+            page.close()
 
-def run_full_check(url: str, page_title: str, user_id: int, progress_placeholder, log_placeholder):
-    """전체 검사 실행"""
+# 공유 캡처 캐시 (검사 시 사용자가 선택한 경우에만 조회/등록)
+SHARED_CACHE_ENABLED = os.environ.get('SHARED_CACHE_ENABLED', '1') != '0'
+SHARED_CACHE_TTL = float(os.environ.get('SHARED_CACHE_TTL', 900))  # 초
+SHARED_CACHE_MAX_BYTES = int(os.environ.get('SHARED_CACHE_MAX_BYTES', 500 * 1024 * 1024))
+BLOB_REF_PREFIX = 'blob:'
+
+# 렌더링용 이미지 캐시 (세션에는 참조만 두고 이미지는 여기서 공유)
+IMAGE_CACHE_MAX_BYTES = int(os.environ.get('IMAGE_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+class ImageLRU:
+    """해시별 이미지 bytes LRU 캐시 (총 크기 제한, 모든 세션 공유)"""
+    
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+    
+    def get(self, blob_hash: str) -> bytes:
+        with self._lock:
+            data = self._items.get(blob_hash)
+            if data is not None:
+                self._items.move_to_end(blob_hash)
+                return data
+        
+        data = get_blob(blob_hash)
+        if data is None or len(data) > self.max_bytes:
+            return data
+        with self._lock:
+            if blob_hash not in self._items:
+                self._items[blob_hash] = data
+                self._size += len(data)
+                while self._size > self.max_bytes:
+                    _, evicted = self._items.popitem(last=False)
+                    self._size -= len(evicted)
+        return data
+
+@st.cache_resource
+def get_image_cache() -> ImageLRU:
+    """프로세스 전역 이미지 캐시"""
+    return ImageLRU(IMAGE_CACHE_MAX_BYTES)
+
+def load_image(value: str, cache: bool = True) -> bytes:
+    """screenshot_data 값(이미지 참조 또는 이전 형식의 base64)을 PNG bytes로 변환
+
+    cache=False는 한 번만 읽는 대량 작업(보고서 등)에서 화면용 캐시를 밀어내지 않게 한다.
+    """
+    if value.startswith(BLOB_REF_PREFIX):
+        blob_hash = value[len(BLOB_REF_PREFIX):]
+        return get_image_cache().get(blob_hash) if cache else get_blob(blob_hash)
+    return base64.b64decode(value)
+
+def capture_profile_id(target: str, profile: str) -> str:
+    """캐시 키에 포함할 캡처 설정 식별자"""
+    if target == 'w3c':
+        if W3C_CAPTURE_REGION:
+            return f"region:{W3C_CAPTURE_REGION}"
+        return f"full:{FULL_PAGE_CAPTURE_MODE}:{TILED_MAX_HEIGHT}:{TILED_SCALE}"
+    return profile
+
+def region_profile(profile: str, region_spec: str) -> str:
+    """캡처 영역까지 구분하는 캐시용 프로필 이름"""
+    return f"{profile}#{region_spec.strip()}" if region_spec and region_spec.strip() else profile
+
+def capture_cache_key(url: str, target: str, profile: str) -> str:
+    key = f"{normalize_url(url)}|{target}|{capture_profile_id(target, profile)}"
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+def lookup_shared_capture(url: str, target: str, profile: str = 'desktop') -> str:
+    """공유 캐시에 신선한 캡처가 있으면 이미지 참조 반환"""
+    blob_hash = get_cached_capture(capture_cache_key(url, target, profile), SHARED_CACHE_TTL)
+    return BLOB_REF_PREFIX + blob_hash if blob_hash else None
+
+def store_capture(png: bytes, url: str, target: str, profile: str = 'desktop', share: bool = False) -> str:
+    """캡처를 이미지 저장소에 넣고 screenshot_data용 참조 반환 (share 시 공유 캐시에도 등록)"""
+    blob_hash = put_blob(png)
+    if share:
+        put_cached_capture(
+            capture_cache_key(url, target, profile), normalize_url(url), target,
+            capture_profile_id(target, profile), blob_hash, len(png),
+            SHARED_CACHE_TTL, SHARED_CACHE_MAX_BYTES
+        )
+    return BLOB_REF_PREFIX + blob_hash
+
+# 캡처 저장 파이프라인 (압축/저장소 기록/이력 갱신을 브라우저 작업과 겹쳐 실행)
+PERSIST_WORKERS = int(os.environ.get('PERSIST_WORKERS', 2))
+PERSIST_MAX_PENDING = int(os.environ.get('PERSIST_MAX_PENDING', 8))  # 초과 시 캡처 스레드 대기
+PNG_OPTIMIZE = os.environ.get('PNG_OPTIMIZE', '1') != '0'
+
+class PersistPipeline:
+    """캡처 저장 작업자 풀 (대기 작업 수 제한으로 배압 적용, 모든 세션 공유)"""
+    
+    def __init__(self, workers: int, max_pending: int):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='persist')
+        self._slots = threading.BoundedSemaphore(max_pending)
+    
+    def submit(self, fn, *args) -> Future:
+        """작업 등록 (대기 작업이 가득 차면 자리가 날 때까지 호출 스레드 차단)"""
+        with trace_span('persist.wait'):
+            self._slots.acquire()
+        parent = current_span()
+        
+        def run():
+            try:
+                with trace_context(parent):
+                    return fn(*args)
+            finally:
+                self._slots.release()
+        
+        try:
+            return self._executor.submit(run)
+        except Exception:
+            self._slots.release()
+            raise
+
+@st.cache_resource
+def get_persist_pipeline() -> PersistPipeline:
+    """프로세스 전역 저장 파이프라인"""
+    return PersistPipeline(PERSIST_WORKERS, PERSIST_MAX_PENDING)
+
+def compress_png(png: bytes) -> bytes:
+    """PNG 재압축 (Pillow 사용 가능 시, 결과가 더 작을 때만 교체)"""
+    if not (PNG_OPTIMIZE and PIL_AVAILABLE):
+        return png
+    with trace_span('persist.compress', bytes=len(png)) as span:
+        output = io.BytesIO()
+        Image.open(io.BytesIO(png)).save(output, format='PNG', optimize=True)
+        optimized = output.getvalue()
+        span['attrs']['saved'] = max(0, len(png) - len(optimized))
+    return optimized if len(optimized) < len(png) else png
+
+def persist_capture(history_id: int, key: str, png: bytes, url: str, target: str,
+                    profile: str = 'desktop', share: bool = False) -> str:
+    """캡처 압축 후 저장소와 이력에 바로 기록 (작업자 스레드에서 실행)"""
+    ref = store_capture(compress_png(png), url, target, profile, share)
+    add_history_capture(history_id, key, ref)
+    return ref
+
+def lookup_shared_blob(url: str, target: str, profile: str = 'desktop') -> bytes:
+    """공유 캐시의 원문 bytes 조회 (이미지 외 결과용)"""
+    ref = lookup_shared_capture(url, target, profile)
+    return get_blob(ref[len(BLOB_REF_PREFIX):]) if ref else None
+
+def run_full_check(url: str, page_title: str, user_id: int, progress_placeholder, log_placeholder,
+                   profiles: list = None, session: BrowserSession = None, use_shared_cache: bool = False,
+                   region: str = None):
+    """전체 검사 실행 (session 지정 시 배치의 브라우저/컨텍스트 재사용, region 지정 시 브라우저 캡처는 해당 영역만)"""
+    profiles = profiles or ['desktop']
+    use_shared_cache = use_shared_cache and SHARED_CACHE_ENABLED
+    cached = []    # 공유 캐시에서 가져온 대상
     logs = []
     screenshot_data = {}
+    captures = {}  # 비교용 원본 PNG
+    errors = {}    # 대상별 실패 사유
+    w3c_messages = None  # W3C 구조화 결과 (None = 조회 실패/생략)
+    w3c_counts = None
+    pending = {}   # 저장 파이프라인에 넘긴 캡처 (키 → Future)
+    shared_writes = []   # 공유 캐시에만 등록하는 부가 결과 (이력에는 기록하지 않음)
+    history_id = None
     
     def add_log(message: str):
         timestamp = datetime.now().strftime('%H:%M:%S')
@@ -550,92 +2142,1191 @@ def run_full_check(url: str, page_title: str, user_id: int, progress_placeholder
         add_log("❌ Playwright가 설치되지 않았습니다.")
         return None
     
+    pipeline = get_persist_pipeline()
     try:
-        with sync_playwright() as playwright:
-            total_steps = 5
-            current_step = 0
-            
-            # 1. W3C 웹 표준 검사
-            add_log("=" * 40)
-            add_log("🏁 웹 표준(W3C) 검사 시작")
-            add_log("=" * 40)
+        with trace_span('check', url=url):
+            # 진행 중 이력을 먼저 만들고 캡처는 완료되는 대로 기록 (중간 실패 시에도 보존)
+            region = (region or '').strip() or None
+            history_id = start_history(user_id, page_title, url, region)
+            capture_region = parse_capture_region(region)
+            with ExitStack() as stack:
+                if session is None:
+                    session = stack.enter_context(open_browser_session())
+                total_steps = 5
+                current_step = 0
             
-            current_step += 1
-            progress_placeholder.progress(current_step / total_steps, f"W3C 검사 중... ({current_step}/{total_steps})")
+                # 1. W3C 웹 표준 검사
+                add_log("=" * 40)
+                add_log("🏁 웹 표준(W3C) 검사 시작")
+                add_log("=" * 40)
             
-            add_log(f"🔍 W3C 검사 페이지 접속 중...")
+                current_step += 1
+                progress_placeholder.progress(current_step / total_steps, f"W3C 검사 중... ({current_step}/{total_steps})")
             
-            browser = playwright.chromium.launch(
-                headless=True,
-                args=['--no-sandbox', '--disable-setuid-sandbox', '--disable-dev-shm-usage']
-            )
-            context = browser.new_context(viewport={'width': 1920, 'height': 1080})
-            page = context.new_page()
+                add_log(f"🔍 W3C 검사 페이지 접속 중...")
             
-            w3c_screenshot = capture_w3c_validation(page, url)
-            if w3c_screenshot:
-                screenshot_data['w3c'] = base64.b64encode(w3c_screenshot).decode('utf-8')
-                add_log("✅ W3C 검사 캡처 완료")
+                w3c_screenshot = None
+                w3c_json = None
+                cached_ref = lookup_shared_capture(url, 'w3c') if use_shared_cache else None
+                if cached_ref:
+                    screenshot_data['w3c'] = cached_ref
+                    add_history_capture(history_id, 'w3c', cached_ref)
+                    captures['w3c'] = load_image(cached_ref)
+                    cached.append('w3c')
+                    add_log("♻️ W3C 공유 캐시 사용")
+                else:
+                    try:
+                        page = session.new_page('w3c', VALIDATOR_HOST)
+                        try:
+                            w3c_notices = []
+                            w3c_screenshot, w3c_json = capture_w3c_validation(page, url, w3c_notices)
+                            if w3c_notices:
+                                # 증빙 이미지가 잘렸음을 이력에 남김 (메시지 목록은 JSON으로 모두 보존)
+                                errors['w3c_truncated'] = w3c_notices[0]
+                                add_log(f"⚠️ W3C 캡처 잘림: {w3c_notices[0]}")
+                        finally:
+                            page.close()
+                    except Exception as e:
+                        errors['w3c'] = error_reason(e)
+                        add_log(f"⚠️ W3C 검사 실패: {errors['w3c']}")
+                if w3c_screenshot:
+                    captures['w3c'] = w3c_screenshot
+                    pending['w3c'] = pipeline.submit(persist_capture, history_id, 'w3c', w3c_screenshot,
+                                                     url, 'w3c', 'desktop', use_shared_cache)
+                    add_log("✅ W3C 검사 캡처 완료")
             
-            browser.close()
+                # W3C 구조화 결과 (오류/경고 목록)
+                # 결과 화면에서 읽지 못한 경우(공유 캐시 캡처 등)에만 검사기에 JSON을 따로 요청
+                if 'w3c' not in errors:
+                    from_cache = False
+                    if w3c_json is None and use_shared_cache:
+                        w3c_json = lookup_shared_blob(url, 'w3c_json')
+                        from_cache = w3c_json is not None
+                    try:
+                        if w3c_json is None:
+                            w3c_json = fetch_w3c_json(url)
+                        if use_shared_cache and not from_cache:
+                            # 공유 캐시에 등록할 때만 저장 (저장 파이프라인에서 처리)
+                            shared_writes.append(pipeline.submit(store_capture, w3c_json, url, 'w3c_json',
+                                                                 'desktop', True))
+                        w3c_messages = parse_w3c_messages(w3c_json)
+                        w3c_counts = {
+                            'errors': sum(1 for m in w3c_messages if m['type'] == 'error'),
+                            'warnings': sum(1 for m in w3c_messages if m['type'] == 'warning'),
+                        }
+                        add_log(f"📋 W3C 오류 {w3c_counts['errors']}건, 경고 {w3c_counts['warnings']}건")
+                    except Exception as e:
+                        errors['w3c_json'] = error_reason(e)
+                        add_log(f"⚠️ W3C 결과 조회 실패: {errors['w3c_json']}")
             
-            # 2-5. 브라우저 호환성 검사
-            browsers = ['Chrome', 'Edge', 'Whale', 'Safari']
+                # 2-5. 브라우저 호환성 검사
+                browsers = ['Chrome', 'Edge', 'Whale', 'Safari']
             
-            for browser_name in browsers:
-                current_step += 1
-                progress_placeholder.progress(current_step / total_steps, f"{browser_name} 검사 중... ({current_step}/{total_steps})")
+                for browser_name in browsers:
+                    current_step += 1
+                    progress_placeholder.progress(current_step / total_steps, f"{browser_name} 검사 중... ({current_step}/{total_steps})")
                 
-                add_log("")
-                add_log("=" * 40)
-                add_log(f"🏁 {browser_name} 호환성 검사 시작")
-                add_log("=" * 40)
-                add_log(f"🌐 {browser_name} 브라우저 시작 중...")
-                add_log(f"🔗 {url} 접속 중...")
+                    add_log("")
+                    add_log("=" * 40)
+                    add_log(f"🏁 {browser_name} 호환성 검사 시작")
+                    add_log("=" * 40)
+                    browser_key = browser_name.lower()
+                    if use_shared_cache:
+                        cached_refs = {p: lookup_shared_capture(url, browser_key, region_profile(p, region))
+                                       for p in profiles}
+                        if all(cached_refs.values()):
+                            for profile_name, ref in cached_refs.items():
+                                key = capture_key(browser_key, profile_name)
+                                screenshot_data[key] = ref
+                                add_history_capture(history_id, key, ref)
+                                captures[key] = load_image(ref)
+                            cached.append(browser_key)
+                            add_log(f"♻️ {browser_name} 공유 캐시 사용")
+                            continue
+                    
+                    add_log(f"🌐 {browser_name} 브라우저 시작 중...")
+                    add_log(f"🔗 {url} 접속 중...")
                 
-                screenshot = capture_browser(playwright, url, browser_name)
-                if screenshot:
-                    screenshot_data[browser_name.lower()] = base64.b64encode(screenshot).decode('utf-8')
-                    add_log(f"✅ {browser_name} 캡처 완료")
+                    try:
+                        fallbacks = {}
+                        shots = capture_browser(session, url, browser_name, profiles, capture_region, fallbacks)
+                    except Exception as e:
+                        shots = {}
+                        errors[browser_name.lower()] = error_reason(e)
+                        add_log(f"⚠️ {browser_name} 캡처 실패: {errors[browser_name.lower()]}")
+                    for profile_name, screenshot in shots.items():
+                        key = capture_key(browser_key, profile_name)
+                        fallback = fallbacks.get(profile_name)
+                        if fallback:
+                            # 지정 영역이 아닌 화면 전체이므로 회귀 비교/공유 캐시에서 제외
+                            errors[f"{key}_region"] = fallback
+                            add_log(f"⚠️ {browser_name} 영역 대체: {fallback}")
+                        captures[key] = screenshot
+                        pending[key] = pipeline.submit(persist_capture, history_id, key, screenshot, url, browser_key,
+                                                       region_profile(profile_name, region),
+                                                       use_shared_cache and not fallback)
+                        add_log(f"✅ {browser_name} {DEVICE_PROFILES[profile_name]['label']} 캡처 완료")
         
-        # 히스토리 저장
-        if screenshot_data:
-            save_history(user_id, page_title, url, screenshot_data)
+            # 브라우저 간 시각적 비교 (프로필별)
+            diff_data = build_diff_report(captures, submit=pipeline.submit)
+            extra_reports = {}
+            for profile_name in profiles:
+                if profile_name == 'desktop':
+                    continue
+                report = build_diff_report(captures, [capture_key(b, profile_name) for b in COMPAT_BROWSERS],
+                                           pipeline.submit)
+                if report:
+                    extra_reports[profile_name] = report
+            if extra_reports:
+                diff_data = dict(diff_data or {}, profiles=extra_reports)
+            for report in [diff_data] + list(extra_reports.values()):
+                for key, info in (report or {}).get('results', {}).items():
+                    add_log(f"🔎 {key} vs {report['reference']} 유사도 {info['similarity'] * 100:.1f}%")
+            
+            # 직전 검사 대비 회귀 비교
+            regression = build_regression_report(
+                captures, get_previous_history(user_id, url, history_id, region),
+                [k for k in captures if k != 'w3c' and f"{k}_region" not in errors]
+            )
+            captures.clear()
+            change_score = None
+            if regression:
+                change_score = regression['change_score']
+                diff_data = dict(diff_data or {}, regression=regression)
+                add_log(f"🔁 이전 검사 대비 변경 {change_score * 100:.1f}%")
+            
+            # 남은 저장 작업 대기 (대부분 다음 브라우저 캡처 중에 이미 끝남)
+            for key, future in pending.items():
+                try:
+                    screenshot_data[key] = future.result()
+                except Exception as e:
+                    errors[key] = f"저장 실패: {e}"
+            for key, e in resolve_diff_overlays(diff_data):
+                add_log(f"⚠️ {key} 차이 오버레이 저장 실패: {e}")
+            for future in shared_writes:
+                try:
+                    future.result()
+                except Exception as e:
+                    add_log(f"⚠️ 공유 캐시 등록 실패: {e}")
+            
+            # 히스토리 마무리 (실패한 캡처도 사유와 함께 기록)
+            finish_history(history_id, diff_data, change_score, errors, w3c_messages)
             add_log("")
             add_log("=" * 40)
-            add_log("🎉 모든 검사가 완료되었습니다!")
+            if errors:
+                add_log(f"⚠️ 검사 완료 (실패 {len(errors)}건)")
+            else:
+                add_log("🎉 모든 검사가 완료되었습니다!")
             add_log("=" * 40)
         
-        return screenshot_data
+            return {'screenshots': screenshot_data, 'diff': diff_data, 'errors': errors, 'cached': cached,
+                    'w3c_counts': w3c_counts, 'history_id': history_id}
         
     except Exception as e:
         add_log(f"❌ 오류 발생: {str(e)}")
+        # 이미 저장된 캡처는 남기고 이력을 실패로 표시
+        if history_id is not None:
+            try:
+                finish_history(history_id, errors=dict(errors, check=str(e)), status='failed')
+            except Exception as db_error:
+                print(f"History finish error: {db_error}")
         return None
 
 # ============================================================================
-# 4. Streamlit UI
+# 5. 시각적 비교 (크로스 브라우저 diff)
 # ============================================================================
+# 기준 브라우저 (없으면 캡처된 첫 브라우저 사용)
+DIFF_REFERENCE_BROWSER = os.environ.get('DIFF_REFERENCE_BROWSER', 'chrome')
+DIFF_WIDTH = 480            # 비교용 축소 폭 (px)
+DIFF_PIXEL_THRESHOLD = 40   # 채널 최대 차이 임계값 (0-255)
+DIFF_BLOCK_SIZE = 8         # 차이 영역 탐지 격자 크기 (축소 이미지 기준 px)
+DIFF_MAX_BOXES = 20
+# 이전 검사 대비 변경으로 간주할 변경 픽셀 비율
+REGRESSION_THRESHOLD = float(os.environ.get('REGRESSION_THRESHOLD', 0.02))
+
+COMPAT_BROWSERS = ['chrome', 'edge', 'whale', 'safari']
+
+def _diff_array(png: bytes, size: tuple = None):
+    """PNG를 비교용 크기로 축소한 RGB 배열 (int16)"""
+    img = Image.open(io.BytesIO(png))
+    if size is None:
+        size = (DIFF_WIDTH, max(1, round(img.height * DIFF_WIDTH / img.width)))
+    # 정수배 축소(reduce)로 먼저 줄인 뒤 색 변환/정확한 크기 조정은 작은 이미지에서 수행
+    factor = min(img.width // size[0], img.height // size[1])
+    if factor > 1:
+        img = img.reduce(factor)
+    img = img.convert('RGB')
+    if img.size != size:
+        img = img.resize(size, Image.Resampling.BILINEAR)
+    return np.asarray(img, dtype=np.int16)
+
+def _diff_boxes(mask) -> list:
+    """차이 마스크를 격자로 묶어 연결된 영역의 경계 상자 계산 (축소 좌표)"""
+    block = DIFF_BLOCK_SIZE
+    h, w = mask.shape
+    gh, gw = -(-h // block), -(-w // block)
+    padded = np.zeros((gh * block, gw * block), dtype=bool)
+    padded[:h, :w] = mask
+    cells = padded.reshape(gh, block, gw, block).any(axis=(1, 3))
+    
+    boxes = []
+    visited = np.zeros_like(cells)
+    for cy, cx in zip(*np.nonzero(cells)):
+        if visited[cy, cx]:
+            continue
+        # 8방향 연결 요소 탐색 (격자 셀 단위라 규모가 작음)
+        visited[cy, cx] = True
+        stack = [(cy, cx)]
+        y0 = y1 = cy
+        x0 = x1 = cx
+        while stack:
+            y, x = stack.pop()
+            y0, y1, x0, x1 = min(y0, y), max(y1, y), min(x0, x), max(x1, x)
+            for ny in range(max(0, y - 1), min(gh, y + 2)):
+                for nx in range(max(0, x - 1), min(gw, x + 2)):
+                    if cells[ny, nx] and not visited[ny, nx]:
+                        visited[ny, nx] = True
+                        stack.append((ny, nx))
+        boxes.append([x0 * block, y0 * block, (x1 + 1) * block, (y1 + 1) * block])
+    
+    boxes.sort(key=lambda b: (b[2] - b[0]) * (b[3] - b[1]), reverse=True)
+    return [[x0, y0, min(x1, w), min(y1, h)] for x0, y0, x1, y1 in boxes[:DIFF_MAX_BOXES]]
+
+def _diff_overlay(target, mask, boxes_small: list) -> bytes:
+    """비교 대상 이미지를 어둡게 하고 차이 픽셀/영역을 강조한 PNG"""
+    overlay = (target // 3).astype(np.uint8)
+    overlay[mask] = (255, 82, 82)
+    img = Image.fromarray(overlay, 'RGB')
+    draw = ImageDraw.Draw(img)
+    for box in boxes_small:
+        draw.rectangle(box, outline=(100, 255, 218), width=2)
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+def _diff_mask(ref_arr, target):
+    """픽셀별 채널 최대 차이가 임계값을 넘는 위치 (bool 배열)"""
+    return np.abs(target - ref_arr).max(axis=2) > DIFF_PIXEL_THRESHOLD
+
+def store_diff_overlay(target, mask, boxes_small: list) -> str:
+    """차이 오버레이 PNG 생성 후 이미지 저장소에 넣고 참조 반환 (저장 파이프라인에서 실행)"""
+    return BLOB_REF_PREFIX + put_blob(_diff_overlay(target, mask, boxes_small))
+
+def compare_captures(reference, png: bytes, submit=None) -> dict:
+    """기준 배열과 캡처 PNG를 비교해 유사도/차이 영역/오버레이 생성
+
+    submit(fn, *args) 지정 시 오버레이 생성/저장은 그쪽에 넘기고 'overlay'에는 Future를 둔다.
+    """
+    ref_arr, ref_width = reference
+    target = _diff_array(png, (ref_arr.shape[1], ref_arr.shape[0]))
+    mask = _diff_mask(ref_arr, target)
+    
+    boxes_small = _diff_boxes(mask)
+    scale = ref_width / ref_arr.shape[1]
+    return {
+        'similarity': round(1.0 - float(mask.mean()), 4),
+        'boxes': [[round(v * scale) for v in box] for box in boxes_small],
+        'overlay': (submit(store_diff_overlay, target, mask, boxes_small) if submit
+                    else store_diff_overlay(target, mask, boxes_small)),
+    }
+
+def build_diff_report(captures: dict, keys: list = COMPAT_BROWSERS, submit=None) -> dict:
+    """브라우저별 캡처(PNG bytes)를 기준 브라우저와 비교한 리포트 (submit은 compare_captures 참고)"""
+    if not (PIL_AVAILABLE and NUMPY_AVAILABLE):
+        return None
+    available = [k for k in keys if captures.get(k)]
+    if len(available) < 2:
+        return None
+    
+    # '브라우저@프로필' 키도 브라우저명으로 기준 선택
+    reference_key = next((k for k in available if k.split('@')[0] == DIFF_REFERENCE_BROWSER), available[0])
+    with trace_span('diff', reference=reference_key, targets=len(available) - 1):
+        ref_png = captures[reference_key]
+        with Image.open(io.BytesIO(ref_png)) as img:
+            ref_width = img.width
+        reference = (_diff_array(ref_png), ref_width)
+        
+        results = {}
+        for key in available:
+            if key == reference_key:
+                continue
+            try:
+                results[key] = compare_captures(reference, captures[key], submit)
+            except Exception as e:
+                print(f"Diff error ({key}): {e}")
+    return {'reference': reference_key, 'results': results}
+
+def resolve_diff_overlays(diff_data: dict) -> list:
+    """파이프라인에 넘긴 오버레이 저장을 기다려 참조로 교체 (실패한 키와 사유 목록 반환)"""
+    failed = []
+    reports = [diff_data] + list((diff_data or {}).get('profiles', {}).values())
+    for report in reports:
+        for key, info in (report or {}).get('results', {}).items():
+            if isinstance(info.get('overlay'), Future):
+                try:
+                    info['overlay'] = info['overlay'].result()
+                except Exception as e:
+                    info.pop('overlay')
+                    failed.append((key, e))
+    return failed
+
+def build_regression_report(captures: dict, previous: dict, keys: list = COMPAT_BROWSERS) -> dict:
+    """직전 이력의 같은 브라우저 캡처와 비교한 변경 점수 (변경 픽셀 비율)"""
+    if not (PIL_AVAILABLE and NUMPY_AVAILABLE) or not previous:
+        return None
+    
+    scores = {}
+    with trace_span('regression', previous_id=previous['id']):
+        for key in keys:
+            old = previous['screenshot_data'].get(key)
+            if not old or not captures.get(key):
+                continue
+            if f"{key}_region" in previous.get('errors', {}):
+                # 직전 캡처는 지정 영역 대신 화면 전체였으므로 비교하지 않음
+                continue
+            try:
+                old_arr = _diff_array(load_image(old))
+                new_arr = _diff_array(captures[key], (old_arr.shape[1], old_arr.shape[0]))
+                scores[key] = round(float(_diff_mask(old_arr, new_arr).mean()), 4)
+            except Exception as e:
+                print(f"Regression diff error ({key}): {e}")
+    
+    if not scores:
+        return None
+    return {'previous_id': previous['id'], 'scores': scores, 'change_score': max(scores.values())}
 
-def render_screenshot(title: str, img_base64: str, badge_class: str):
-    """스크린샷 렌더링"""
-    if img_base64:
+# ============================================================================
+# 6. URL 자동 탐색 (사이트맵/크롤링)
+# ============================================================================
+DISCOVERY_MAX_PAGES = 200       # 한 번에 탐색 가능한 최대 페이지 수
+DISCOVERY_FETCH_TIMEOUT = 15    # 초
+DISCOVERY_MAX_BYTES = 5 * 1024 * 1024
+SITEMAP_MAX_UNCOMPRESSED = 10 * DISCOVERY_MAX_BYTES  # .xml.gz 압축 해제 상한 (사이트맵 규격 최대 50MB)
+DISCOVERY_USER_AGENT = 'Mozilla/5.0 (compatible; WebChecker/1.0; +https://validator.w3.org)'
+
+# 정규화 시 제거할 추적용 쿼리 파라미터
+TRACKING_PARAMS = {'gclid', 'fbclid', 'msclkid', 'yclid'}
+
+# 캡처 대상이 아닌 리소스 확장자
+NON_HTML_EXTENSIONS = (
+    '.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp', '.ico', '.pdf', '.zip',
+    '.css', '.js', '.json', '.xml', '.mp4', '.mp3', '.woff', '.woff2', '.ttf',
+)
+
+def normalize_url(url: str) -> str:
+    """URL 정규화 (스킴/호스트 소문자, 기본 포트·fragment·추적 파라미터 제거, 쿼리 정렬)"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or 'https'
+    host = (parts.hostname or '').lower()
+    port = parts.port
+    if port and not ((scheme == 'http' and port == 80) or (scheme == 'https' and port == 443)):
+        host = f"{host}:{port}"
+    path = re.sub(r'/{2,}', '/', parts.path) or '/'
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k not in TRACKING_PARAMS and not k.startswith('utm_')
+    ))
+    return urlunsplit((scheme, host, path, query, ''))
+
+def _parse_patterns(text: str) -> list:
+    """쉼표/줄바꿈으로 구분된 정규식 패턴 목록"""
+    return [re.compile(p.strip()) for p in re.split(r'[,\n]', text or '') if p.strip()]
+
+class URLFrontier:
+    """정규화·중복 제거된 탐색 대기열 (깊이/페이지 수 제한, 포함/제외 패턴)"""
+    
+    def __init__(self, max_pages: int, max_depth: int, include: list = None, exclude: list = None):
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.include = include or []
+        self.exclude = exclude or []
+        self.queue = deque()
+        # 전체 URL 대신 8바이트 다이제스트만 보관해 메모리 절약
+        self.seen = set()
+        self.emitted = 0
+    
+    def _fingerprint(self, url: str) -> bytes:
+        return hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest()
+    
+    def allowed(self, url: str) -> bool:
+        """제외 패턴에 걸리지 않는 URL인지"""
+        return not any(p.search(url) for p in self.exclude)
+    
+    def wanted(self, url: str) -> bool:
+        """캡처 대상 URL인지 (포함 패턴 미지정 시 전체)"""
+        return not self.include or any(p.search(url) for p in self.include)
+    
+    def push(self, url: str, depth: int = 0) -> bool:
+        """새 URL이면 대기열에 추가"""
+        if depth > self.max_depth or not self.allowed(url):
+            return False
+        fingerprint = self._fingerprint(url)
+        if fingerprint in self.seen:
+            return False
+        self.seen.add(fingerprint)
+        self.queue.append((url, depth))
+        return True
+    
+    def pop(self):
+        return self.queue.popleft() if self.queue else None
+    
+    @property
+    def full(self) -> bool:
+        return self.emitted >= self.max_pages
+
+class _LinkParser(HTMLParser):
+    """HTML에서 <a href>와 <title> 추출"""
+    
+    def __init__(self):
+        super().__init__()
+        self.links = []
+        self.title = ''
+        self._in_title = False
+    
+    def handle_starttag(self, tag, attrs):
+        if tag == 'a':
+            href = dict(attrs).get('href')
+            if href:
+                self.links.append(href)
+        elif tag == 'title':
+            self._in_title = True
+    
+    def handle_endtag(self, tag):
+        if tag == 'title':
+            self._in_title = False
+    
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+
+def _fetch(url: str, max_bytes: int = DISCOVERY_MAX_BYTES, timeout: float = DISCOVERY_FETCH_TIMEOUT) -> tuple:
+    """URL 본문과 Content-Type 조회 (크기 제한, 캡처와 같은 호스트별 요청 간격/동시 요청 수 적용)"""
+    request = urllib.request.Request(url, headers={'User-Agent': DISCOVERY_USER_AGENT})
+    with get_host_politeness().slot(urlsplit(url).hostname or ''), \
+            urllib.request.urlopen(request, timeout=timeout) as response:
+        body = response.read(max_bytes)
+        return body, response.headers.get('Content-Type', ''), response.geturl()
+
+def _title_from_url(url: str) -> str:
+    """페이지 제목이 없을 때 URL 경로로 제목 생성"""
+    parts = urlsplit(url)
+    path = unquote(parts.path).strip('/')
+    return f"{parts.hostname}/{path}" if path else parts.hostname or url
+
+def is_sitemap_url(url: str) -> bool:
+    path = urlsplit(url).path.lower()
+    return path.endswith(('.xml', '.xml.gz')) or 'sitemap' in path
+
+def _gunzip_limited(body: bytes, limit: int = SITEMAP_MAX_UNCOMPRESSED) -> bytes:
+    """gzip 본문을 limit 바이트까지만 풀기 (초과 시 ValueError, 압축 폭탄 방지)"""
+    with gzip.GzipFile(fileobj=io.BytesIO(body)) as f:
+        data = f.read(limit + 1)
+    if len(data) > limit:
+        raise ValueError(f"압축 해제 크기가 {limit // 1024 // 1024}MB를 넘음")
+    return data
+
+def _iter_sitemap(url: str, frontier: URLFrontier):
+    """사이트맵(인덱스 포함)의 <loc> URL을 순서대로 생성"""
+    sitemaps = deque([url])
+    visited = set()
+    while sitemaps and not frontier.full:
+        sitemap_url = sitemaps.popleft()
+        if sitemap_url in visited:
+            continue
+        visited.add(sitemap_url)
+        try:
+            with trace_span('discovery.fetch', url=sitemap_url, kind='sitemap'):
+                body, _, _ = _fetch(sitemap_url)
+            if body[:2] == b'\x1f\x8b':
+                body = _gunzip_limited(body)
+            # 큰 사이트맵도 요소 단위로 처리
+            for _, elem in ET.iterparse(io.BytesIO(body)):
+                tag = elem.tag.rsplit('}', 1)[-1]
+                if tag == 'sitemap':
+                    loc = elem.findtext('{*}loc')
+                    if loc:
+                        sitemaps.append(loc.strip())
+                    elem.clear()
+                elif tag == 'url':
+                    loc = elem.findtext('{*}loc')
+                    elem.clear()
+                    if loc:
+                        yield loc.strip()
+        except Exception as e:
+            print(f"Sitemap error ({sitemap_url}): {e}")
+
+def discover_urls(root: str, max_pages: int = 20, max_depth: int = 2,
+                  include: str = '', exclude: str = ''):
+    """루트 URL 크롤링 또는 사이트맵에서 (제목, URL)을 발견 즉시 생성
+    
+    생성기이므로 호출 측은 탐색이 끝나기 전에 첫 URL부터 캡처를 시작할 수 있다.
+    """
+    frontier = URLFrontier(min(max_pages, DISCOVERY_MAX_PAGES), max_depth,
+                           _parse_patterns(include), _parse_patterns(exclude))
+    
+    if is_sitemap_url(root):
+        for loc in _iter_sitemap(root, frontier):
+            url = normalize_url(loc)
+            if frontier.push(url) and frontier.wanted(url):
+                frontier.emitted += 1
+                yield _title_from_url(url), url
+                if frontier.full:
+                    return
+        return
+    
+    root = normalize_url(root)
+    root_host = urlsplit(root).hostname
+    robots = RobotFileParser()
+    try:
+        body, _, _ = _fetch(urljoin(root, '/robots.txt'))
+        robots.parse(body.decode('utf-8', errors='replace').splitlines())
+    except Exception:
+        robots = None
+    
+    frontier.push(root)
+    fetched = 0
+    # 포함 패턴에 맞지 않는 페이지도 경유지로 방문하되 무한 탐색은 방지
+    while not frontier.full and fetched < frontier.max_pages * 5:
+        item = frontier.pop()
+        if item is None:
+            return
+        url, depth = item
+        if robots and not robots.can_fetch(DISCOVERY_USER_AGENT, url):
+            continue
+        try:
+            with trace_span('discovery.fetch', url=url, kind='page', depth=depth):
+                body, content_type, final_url = _fetch(url)
+        except Exception as e:
+            print(f"Crawl error ({url}): {e}")
+            continue
+        fetched += 1
+        if 'html' not in content_type.lower():
+            continue
+        
+        parser = _LinkParser()
+        try:
+            parser.feed(body.decode('utf-8', errors='replace'))
+        except Exception:
+            pass
+        
+        if frontier.wanted(url):
+            frontier.emitted += 1
+            yield (parser.title.strip() or _title_from_url(url))[:100], url
+        
+        if depth >= frontier.max_depth:
+            continue
+        for href in parser.links:
+            link = urljoin(final_url, href.strip())
+            if not link.startswith(('http://', 'https://')):
+                continue
+            link = normalize_url(link)
+            if urlsplit(link).hostname != root_host:
+                continue
+            if urlsplit(link).path.lower().endswith(NON_HTML_EXTENSIONS):
+                continue
+            frontier.push(link, depth + 1)
+
+# ============================================================================
+# 7. 정기 검사 (저장된 URL 세트를 백그라운드에서 주기적으로 검사)
+# ============================================================================
+SCHEDULER_ENABLED = os.environ.get('SCHEDULER_ENABLED', '1') != '0'
+SCHEDULE_POLL_INTERVAL = float(os.environ.get('SCHEDULE_POLL_INTERVAL', 60))  # 초
+SCHEDULE_JITTER = float(os.environ.get('SCHEDULE_JITTER', 600))  # 초, 실행 시각에 더할 최대 무작위 지연
+SCHEDULE_BATCH_SIZE = int(os.environ.get('SCHEDULE_BATCH_SIZE', 10))  # 브라우저 세션 하나로 검사할 URL 수
+SCHEDULE_MAX_SETS_PER_POLL = 20
+SCHEDULE_OWNER = 'scheduler'  # 허용 대기열에서 정기 검사 전체가 사용자 한 명 몫을 받음
+
+SCHEDULE_INTERVALS = {1: '매일', 7: '매주', 30: '매월 (30일)'}
+
+class _NullPlaceholder:
+    """화면 없이 실행할 때 진행 표시 무시 (백그라운드 검사용)"""
+    
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+def plan_scheduled_batches(url_sets: list, batch_size: int = SCHEDULE_BATCH_SIZE) -> list:
+    """실행할 URL 세트들을 중복 제거 후 호스트를 섞어 batch_size개씩 묶음
+
+    같은 사용자가 같은 URL을 같은 프로필로 여러 세트에 넣었으면 한 번만 검사한다.
+    """
+    jobs = []
+    seen = set()
+    for url_set in url_sets:
+        for title, url, *rest in url_set['urls']:
+            region = rest[0] if rest else ''
+            key = (url_set['user_id'], normalize_url(url), tuple(url_set['profiles']), region)
+            if key in seen:
+                continue
+            seen.add(key)
+            jobs.append((title, url, url_set['user_id'], url_set['profiles'], region))
+    jobs = interleave_by_host(jobs)
+    return [jobs[i:i + batch_size] for i in range(0, len(jobs), batch_size)]
+
+def run_scheduled_batch(batch: list):
+    """정기 검사 배치 실행 (브라우저 세션 공유, 결과는 각 사용자 이력에 저장)
+
+    브라우저 실행 실패 등으로 배치가 중단되면 남은 URL을 실패 이력으로 남긴 뒤 예외를 다시 던진다.
+    """
+    placeholder = _NullPlaceholder()
+    done = 0
+    try:
+        with trace_span('batch', user=SCHEDULE_OWNER, scheduled=True, url_count=len(batch)), \
+                AdmittedSession(SCHEDULE_OWNER) as admitted:
+            for title, url, user_id, profiles, region in batch:
+                started = time.time()
+                run_full_check(url, title, user_id, placeholder, placeholder, profiles, admitted.session(),
+                               region=region)
+                done += 1
+                admitted.checkpoint(time.time() - started)
+    except Exception as e:
+        reason = f"정기 검사 실행 실패: {error_reason(e)}"
+        for title, url, user_id, _, region in batch[done:]:
+            history_id = start_history(user_id, title, url, region or None)
+            finish_history(history_id, errors={'check': reason}, status='failed')
+        raise
+
+class CheckScheduler:
+    """실행 시각이 된 URL 세트를 찾아 배치로 검사하는 백그라운드 스레드 (프로세스당 하나)"""
+    
+    def __init__(self, poll_interval: float = SCHEDULE_POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self._thread = threading.Thread(target=self._run, name='check-scheduler', daemon=True)
+        self._thread.start()
+    
+    def _run(self):
+        while True:
+            # 여러 프로세스가 같은 순간에 조회하지 않도록 조회 간격에도 지터
+            time.sleep(self.poll_interval * random.uniform(0.8, 1.2))
+            try:
+                self.run_due()
+            except Exception as e:
+                print(f"Scheduler error: {e}")
+    
+    def run_due(self) -> int:
+        """실행할 때가 된 세트 검사, 검사한 URL 수 반환"""
+        url_sets = claim_due_url_sets(time.time(), SCHEDULE_JITTER, SCHEDULE_MAX_SETS_PER_POLL)
+        checked = 0
+        for batch in plan_scheduled_batches(url_sets):
+            # 한 배치가 실패해도 이미 가져간 나머지 세트는 계속 검사
+            try:
+                run_scheduled_batch(batch)
+            except Exception as e:
+                print(f"Scheduled batch error: {e}")
+                continue
+            checked += len(batch)
+        return checked
+
+@st.cache_resource
+def get_check_scheduler() -> CheckScheduler:
+    """프로세스 전역 정기 검사 스케줄러 (처음 호출 시 시작)"""
+    return CheckScheduler()
+
+# ============================================================================
+# 8. 증빙 보고서 (이력 한 건당 한 페이지, HTML/PDF)
+# ============================================================================
+REPORT_DIR = os.environ.get('REPORT_DIR', os.path.join(DB_DIR, "reports"))
+REPORT_MAX_PAGES = int(os.environ.get('REPORT_MAX_PAGES', 1000))
+# 보고서 파일 하나의 최대 크기 (넘으면 여러 권으로 나눠 각각 다운로드)
+REPORT_DOWNLOAD_MAX_BYTES = int(os.environ.get('REPORT_DOWNLOAD_MAX_BYTES', 32 * 1024 * 1024))
+REPORT_FONT_PATH = os.environ.get('REPORT_FONT_PATH', '')
+REPORT_RETENTION = 24 * 3600      # 초, 지난 보고서 파일은 새 보고서 생성 시 삭제
+REPORT_PAGE_PX = (1240, 1754)     # A4 150dpi (PDF 페이지 이미지)
+REPORT_PAGE_PT = (595.28, 841.89) # A4 (PDF 단위)
+REPORT_JPEG_QUALITY = 85
+REPORT_HTML_IMAGE_WIDTH = 960     # HTML 보고서에 넣는 이미지 최대 폭 (px)
+
+# 한글 글꼴 후보 (REPORT_FONT_PATH 미설정 시 순서대로 시도)
+REPORT_FONT_CANDIDATES = [
+    '/usr/share/fonts/truetype/nanum/NanumGothic.ttf',
+    '/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc',
+    'C:/Windows/Fonts/malgun.ttf',
+    '/System/Library/Fonts/AppleSDGothicNeo.ttc',
+]
+
+REPORT_BROWSERS = [('chrome', 'Chrome'), ('edge', 'Edge'), ('whale', 'Whale'), ('safari', 'Safari')]
+
+def _report_meta(history: dict) -> list:
+    """보고서 페이지 상단에 표시할 (항목, 값) 목록"""
+    rows = [('URL', history['url']), ('검사일', history['created_at'])]
+    if history['capture_region']:
+        rows.append(('캡처 영역', history['capture_region']))
+    if history['w3c_errors'] is not None:
+        rows.append(('W3C', f"오류 {history['w3c_errors']}건, 경고 {history['w3c_warnings'] or 0}건"))
+    for key, reason in history['errors'].items():
+        rows.append(('주의' if key.rpartition('_')[2] in CAPTURE_NOTICES else '실패', f"{key}: {reason}"))
+    return rows
+
+def _report_jpeg(png: bytes, max_width: int = REPORT_HTML_IMAGE_WIDTH) -> bytes:
+    """캡처를 보고서용 폭으로 줄여 JPEG로 변환 (긴 W3C 캡처도 비율 유지)"""
+    with Image.open(io.BytesIO(png)) as img:
+        img.thumbnail((max_width, 65000))
+        output = io.BytesIO()
+        img.convert('RGB').save(output, format='JPEG', quality=REPORT_JPEG_QUALITY)
+    return output.getvalue()
+
+class HtmlReport:
+    """이미지를 data URI로 넣은 단일 HTML 보고서 (페이지마다 바로 파일에 기록)"""
+    
+    def __init__(self, fp, title: str):
+        self.fp = fp
+        fp.write(f"""<!DOCTYPE html>
+<html lang="ko"><head><meta charset="utf-8"><title>{html.escape(title)}</title>
+<style>
+body {{ font-family: sans-serif; color: #222; margin: 0; }}
+section {{ padding: 24px; page-break-after: always; }}
+h2 {{ margin: 0 0 8px; }}
+table {{ border-collapse: collapse; margin-bottom: 12px; font-size: 13px; }}
+th {{ text-align: left; padding: 2px 12px 2px 0; color: #555; }}
+figure {{ margin: 0 0 12px; }}
+figcaption {{ font-weight: bold; margin-bottom: 4px; }}
+img {{ max-width: 100%; border: 1px solid #ccc; }}
+.grid {{ display: grid; grid-template-columns: 1fr 1fr; gap: 12px; }}
+.missing {{ color: #999; border: 1px dashed #ccc; padding: 24px; text-align: center; }}
+</style></head><body>
+""")
+    
+    def _figure(self, label: str, ref: str):
+        self.fp.write(f"<figure><figcaption>{html.escape(label)}</figcaption>")
+        image = load_image(ref, cache=False) if ref else None
+        if image:
+            mime = 'image/png'
+            if PIL_AVAILABLE:
+                image, mime = _report_jpeg(image), 'image/jpeg'
+            self.fp.write(f'<img src="data:{mime};base64,')
+            self.fp.write(base64.b64encode(image).decode('ascii'))
+            self.fp.write('">')
+        else:
+            self.fp.write('<div class="missing">캡처 없음</div>')
+        self.fp.write("</figure>\n")
+    
+    def add_page(self, history: dict):
+        screenshots = history['screenshot_data']
+        self.fp.write(f"<section><h2>{html.escape(history['page_title'])}</h2><table>")
+        for label, value in _report_meta(history):
+            self.fp.write(f"<tr><th>{html.escape(label)}</th><td>{html.escape(str(value))}</td></tr>")
+        self.fp.write("</table>\n")
+        self._figure("W3C", screenshots.get('w3c'))
+        self.fp.write('<div class="grid">')
+        for key, name in REPORT_BROWSERS:
+            self._figure(name, screenshots.get(key))
+        self.fp.write("</div></section>\n")
+    
+    def close(self):
+        self.fp.write("</body></html>\n")
+
+class StreamingPdfWriter:
+    """페이지 이미지(JPEG)를 받는 즉시 파일에 쓰는 최소 PDF 작성기
+
+    페이지 트리와 xref는 마지막에 한 번만 쓰므로 페이지 수에 비례한 시간과
+    페이지 하나 분량의 메모리만 쓴다. (1: Catalog, 2: Pages, 3부터 페이지별 객체)
+    """
+    
+    def __init__(self, fp, page_size: tuple = REPORT_PAGE_PT):
+        self.fp = fp
+        self.page_size = page_size
+        self.offsets = {}
+        self.page_ids = []
+        self._next_id = 3
+        fp.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    
+    def _write_object(self, obj_id: int, body: str, stream: bytes = None):
+        self.offsets[obj_id] = self.fp.tell()
+        self.fp.write(f"{obj_id} 0 obj\n{body}".encode('ascii'))
+        if stream is not None:
+            self.fp.write(b"\nstream\n" + stream + b"\nendstream")
+        self.fp.write(b"\nendobj\n")
+    
+    def add_page(self, image):
+        """RGB 이미지를 한 페이지로 추가"""
+        output = io.BytesIO()
+        image.save(output, format='JPEG', quality=REPORT_JPEG_QUALITY)
+        jpeg = output.getvalue()
+        image_id, content_id, page_id = self._next_id, self._next_id + 1, self._next_id + 2
+        self._next_id += 3
+        width, height = self.page_size
+        
+        self._write_object(image_id, (
+            f"<< /Type /XObject /Subtype /Image /Width {image.width} /Height {image.height} "
+            f"/ColorSpace /DeviceRGB /BitsPerComponent 8 /Filter /DCTDecode /Length {len(jpeg)} >>"
+        ), jpeg)
+        content = f"q {width:.2f} 0 0 {height:.2f} 0 0 cm /Im0 Do Q".encode('ascii')
+        self._write_object(content_id, f"<< /Length {len(content)} >>", content)
+        self._write_object(page_id, (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {width:.2f} {height:.2f}] "
+            f"/Resources << /XObject << /Im0 {image_id} 0 R >> >> /Contents {content_id} 0 R >>"
+        ))
+        self.page_ids.append(page_id)
+    
+    def close(self):
+        kids = ' '.join(f"{page_id} 0 R" for page_id in self.page_ids)
+        self._write_object(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>")
+        self._write_object(1, "<< /Type /Catalog /Pages 2 0 R >>")
+        xref_offset = self.fp.tell()
+        self.fp.write(f"xref\n0 {self._next_id}\n0000000000 65535 f \n".encode('ascii'))
+        for obj_id in range(1, self._next_id):
+            self.fp.write(f"{self.offsets[obj_id]:010d} 00000 n \n".encode('ascii'))
+        self.fp.write(
+            f"trailer\n<< /Size {self._next_id} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode('ascii')
+        )
+
+def _report_font(size: int):
+    """보고서용 글꼴 (한글 글꼴이 없으면 기본 글꼴)"""
+    for path in [REPORT_FONT_PATH] + REPORT_FONT_CANDIDATES:
+        if path and os.path.exists(path):
+            try:
+                return ImageFont.truetype(path, size)
+            except OSError:
+                continue
+    try:
+        return ImageFont.load_default(size)  # Pillow 10.1+
+    except TypeError:
+        return ImageFont.load_default()
+
+class PdfReport:
+    """이력 한 건을 A4 페이지 이미지로 그려 StreamingPdfWriter에 추가"""
+    
+    MARGIN = 60
+    
+    def __init__(self, fp):
+        self.writer = StreamingPdfWriter(fp)
+        self.title_font = _report_font(34)
+        self.text_font = _report_font(20)
+    
+    def _paste(self, page, draw, label: str, ref: str, box: tuple, crop_top: bool = False):
+        """라벨과 캡처를 box(x, y, w, h) 안에 비율 유지해 배치 (crop_top: 긴 이미지는 위쪽만)"""
+        x, y, w, h = box
+        draw.text((x, y), label, fill=(34, 34, 34), font=self.text_font)
+        y += 30
+        h -= 30
+        image = load_image(ref, cache=False) if ref else None
+        if not image:
+            draw.rectangle((x, y, x + w, y + h), outline=(200, 200, 200))
+            draw.text((x + 20, y + 20), "캡처 없음", fill=(150, 150, 150), font=self.text_font)
+            return
+        with Image.open(io.BytesIO(image)) as img:
+            if img.mode not in ('RGB', 'RGBA', 'L'):
+                img = img.convert('RGB')
+            if crop_top and img.height * w > img.width * h:
+                img = img.crop((0, 0, img.width, max(1, img.width * h // w)))
+            # 축소 후 변환 (원본 크기 변환 비용 절약)
+            img.thumbnail((w, h))
+            img = img.convert('RGB')
+            page.paste(img, (x, y))
+            draw.rectangle((x, y, x + img.width, y + img.height), outline=(200, 200, 200))
+    
+    def add_page(self, history: dict):
+        page = Image.new('RGB', REPORT_PAGE_PX, 'white')
+        draw = ImageDraw.Draw(page)
+        m = self.MARGIN
+        width = REPORT_PAGE_PX[0] - 2 * m
+        
+        draw.text((m, m), history['page_title'][:40], fill=(0, 0, 0), font=self.title_font)
+        y = m + 60
+        for label, value in _report_meta(history)[:6]:
+            draw.text((m, y), f"{label}: {str(value)[:90]}", fill=(80, 80, 80), font=self.text_font)
+            y += 30
+        
+        screenshots = history['screenshot_data']
+        self._paste(page, draw, "W3C", screenshots.get('w3c'), (m, 320, width, 580), crop_top=True)
+        cell_w = (width - 20) // 2
+        for idx, (key, name) in enumerate(REPORT_BROWSERS):
+            col, row = idx % 2, idx // 2
+            self._paste(page, draw, name, screenshots.get(key),
+                        (m + col * (cell_w + 20), 920 + row * 380, cell_w, 360))
+        
+        self.writer.add_page(page)
+    
+    def close(self):
+        self.writer.close()
+
+def cleanup_reports():
+    """보관 기간이 지난 보고서 파일 삭제"""
+    if not os.path.isdir(REPORT_DIR):
+        return
+    cutoff = time.time() - REPORT_RETENTION
+    for name in os.listdir(REPORT_DIR):
+        path = os.path.join(REPORT_DIR, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            continue
+
+def report_volume_path(path: str, volume: int) -> str:
+    """보고서 n권째 파일 경로 (1권은 path 그대로, 이후 _2, _3 ...)"""
+    if volume == 1:
+        return path
+    stem, ext = os.path.splitext(path)
+    return f"{stem}_{volume}{ext}"
+
+def generate_report(history_ids, fmt: str, path: str, title: str = "웹 표준/호환성 증빙 자료",
+                    on_progress=None, max_bytes: int = REPORT_DOWNLOAD_MAX_BYTES) -> list:
+    """이력 ID 순서대로 한 건씩 읽어 보고서 파일 작성 (최대 REPORT_MAX_PAGES)
+
+    파일이 max_bytes를 넘을 것 같으면 새 권을 시작하며, 각 권은 독립된 HTML/PDF다.
+    [(파일 경로, 페이지 수), ...] 반환.
+    """
+    volumes = []
+    pages = 0
+    largest_page = 0
+    fp = report = None
+    with trace_span('report', format=fmt) as span:
+        try:
+            for history_id in history_ids:
+                if pages >= REPORT_MAX_PAGES:
+                    break
+                history = get_history_by_id(history_id)
+                if not history:
+                    continue
+                if fp is not None:
+                    fp.flush()
+                    size = os.fstat(fp.fileno()).st_size
+                    if size + largest_page > max_bytes:
+                        report.close()
+                        fp.close()
+                        fp = None
+                if fp is None:
+                    volume_path = report_volume_path(path, len(volumes) + 1)
+                    volume_title = title if not volumes else f"{title} ({len(volumes) + 1})"
+                    if fmt == 'html':
+                        fp = open(volume_path, 'w', encoding='utf-8')
+                        report = HtmlReport(fp, volume_title)
+                    else:
+                        fp = open(volume_path, 'wb')
+                        report = PdfReport(fp)
+                    volumes.append([volume_path, 0])
+                    fp.flush()
+                    size = os.fstat(fp.fileno()).st_size
+                report.add_page(history)
+                fp.flush()
+                largest_page = max(largest_page, os.fstat(fp.fileno()).st_size - size)
+                volumes[-1][1] += 1
+                pages += 1
+                if on_progress:
+                    on_progress(pages)
+            if fp is None:
+                # 이력이 없어도 빈 보고서 1권
+                fp = open(path, 'w', encoding='utf-8') if fmt == 'html' else open(path, 'wb')
+                report = HtmlReport(fp, title) if fmt == 'html' else PdfReport(fp)
+                volumes.append([path, 0])
+            report.close()
+        finally:
+            if fp is not None:
+                fp.close()
+        span['attrs'].update(pages=pages, volumes=len(volumes))
+    return [tuple(volume) for volume in volumes]
+
+# ============================================================================
+# 9. Streamlit UI
+# ============================================================================
+
+def render_screenshot(title: str, image_ref: str, badge_class: str, file_stem: str = None):
+    """스크린샷 렌더링 (이미지 참조 또는 base64)"""
+    image = load_image(image_ref) if image_ref else None
+    if image:
         st.markdown(f"""
             <div class="bento-card">
                 <span class="badge {badge_class}">{title}</span>
                 <span style="color: #e0e0e0; font-weight: 600; margin-left: 10px;">{title} 캡처</span>
             </div>
         """, unsafe_allow_html=True)
-        st.image(f"data:image/png;base64,{img_base64}", use_container_width=True)
+        st.image(image, use_container_width=True)
         
         # 다운로드 버튼
         st.download_button(
             label=f"📥 {title} 이미지 다운로드",
-            data=base64.b64decode(img_base64),
-            file_name=f"{title.lower()}_capture.png",
+            data=image,
+            file_name=f"{file_stem or title.lower()}_capture.png",
             mime="image/png",
             key=f"download_{title}_{datetime.now().timestamp()}"
         )
 
+# 캡처는 저장됐지만 증빙으로 불완전한 경우 errors에 '{대상}_{종류}' 키로 기록
+CAPTURE_NOTICES = {'truncated': '캡처 잘림', 'region': '영역 대체'}
+
+def render_capture_errors(errors: dict):
+    """실패한 캡처와 사유 표시"""
+    labels = {'w3c': 'W3C', 'w3c_json': 'W3C 결과(JSON)'}
+    for key, reason in (errors or {}).items():
+        target, _, kind = key.rpartition('_')
+        if key == 'check':
+            st.error(f"검사 중단: {reason} (중단 전까지 저장된 캡처만 표시)")
+        elif kind in CAPTURE_NOTICES:
+            st.warning(f"{labels.get(target, target.capitalize())} {CAPTURE_NOTICES[kind]}: {reason}")
+        else:
+            st.warning(f"{labels.get(key, key.capitalize())} 캡처 실패: {reason}")
+
+def w3c_badges(w3c_errors: int, w3c_warnings: int) -> str:
+    """W3C 오류/경고 수 뱃지 HTML (구조화 결과가 없으면 빈 문자열)"""
+    if w3c_errors is None:
+        return ""
+    return (f'<span class="badge badge-error">오류 {w3c_errors}</span>'
+            f'<span class="badge badge-warning">경고 {w3c_warnings or 0}</span>')
+
+def render_w3c_messages(history_id: int, w3c_errors: int, w3c_warnings: int):
+    """W3C 오류/경고 수와 메시지 목록 렌더링"""
+    if w3c_errors is None:
+        return
+    st.markdown(w3c_badges(w3c_errors, w3c_warnings), unsafe_allow_html=True)
+    messages = [m for m in get_w3c_messages(history_id) if m['type'] != 'info']
+    if not messages:
+        return
+    with st.expander(f"📋 W3C 메시지 {len(messages)}건"):
+        for m in messages:
+            icon = "🔴" if m['type'] == 'error' else "🟡"
+            line = f"{m['line']}행: " if m['line'] else ""
+            st.markdown(f"{icon} {line}{m['message']}")
+            if m['extract']:
+                st.code(m['extract'], language='html')
+
+def render_profile_captures(screenshots: dict, diff_data: dict):
+    """데스크톱 외 디바이스 프로필 캡처를 프로필별 탭으로 렌더링"""
+    profile_names = [
+        name for name in DEVICE_PROFILES
+        if name != 'desktop' and any(capture_key(b, name) in screenshots for b in COMPAT_BROWSERS)
+    ]
+    if not profile_names:
+        return
+    
+    st.markdown("#### 📱 디바이스 프로필")
+    tabs = st.tabs([
+        f"{DEVICE_PROFILES[name]['label']} ({DEVICE_PROFILES[name]['width']}px)" for name in profile_names
+    ])
+    profile_reports = (diff_data or {}).get('profiles', {})
+    for tab, name in zip(tabs, profile_names):
+        with tab:
+            col1, col2 = st.columns(2)
+            for idx, browser_key in enumerate(COMPAT_BROWSERS):
+                key = capture_key(browser_key, name)
+                if key in screenshots:
+                    with (col1 if idx % 2 == 0 else col2):
+                        render_screenshot(f"{browser_key.capitalize()} {DEVICE_PROFILES[name]['label']}",
+                                          screenshots[key], f"badge-{browser_key}",
+                                          file_stem=key.replace('@', '_'))
+            if name in profile_reports:
+                render_diff_report(profile_reports[name])
+
+def render_diff_report(diff_data: dict):
+    """브라우저 간 시각적 비교 및 이전 검사 대비 변경 결과 렌더링"""
+    if not diff_data:
+        return
+    
+    regression = diff_data.get('regression')
+    if regression:
+        changed = regression['change_score'] >= REGRESSION_THRESHOLD
+        st.markdown(f"#### 🔁 이전 검사 대비 {'변경 감지' if changed else '변경 없음'}")
+        st.caption(" · ".join(
+            f"{key.capitalize()} {score * 100:.1f}%" for key, score in regression['scores'].items()
+        ))
+    
+    if not diff_data.get('results'):
+        return
+    
+    reference = diff_data['reference'].capitalize()
+    st.markdown(f"#### 🔎 시각적 비교 (기준: {reference})")
+    
+    cols = st.columns(len(diff_data['results']))
+    for col, (key, info) in zip(cols, diff_data['results'].items()):
+        with col:
+            st.metric(f"{key.capitalize()} 유사도", f"{info['similarity'] * 100:.1f}%")
+            if info.get('overlay'):
+                st.image(load_image(info['overlay']), use_container_width=True)
+            st.caption(f"차이 영역 {len(info['boxes'])}개: " + ", ".join(
+                f"({x0},{y0})-({x1},{y1})" for x0, y0, x1, y1 in info['boxes'][:5]
+            ) if info['boxes'] else "차이 영역 없음")
+
+def render_report_builder(make_ids, key: str):
+    """보고서 형식 선택/생성/다운로드 (make_ids: 이력 ID iterable을 만드는 함수)"""
+    fmt = st.radio("형식", ["pdf", "html"], horizontal=True, key=f"report_format_{key}",
+                   format_func=str.upper)
+    if st.button("📑 증빙 보고서 만들기", key=f"report_build_{key}", use_container_width=True):
+        cleanup_reports()
+        Path(REPORT_DIR).mkdir(parents=True, exist_ok=True)
+        path = os.path.join(
+            REPORT_DIR, f"report_{st.session_state.user_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
+        )
+        status = st.empty()
+        volumes = generate_report(make_ids(), fmt, path,
+                                  on_progress=lambda n: status.caption(f"보고서 작성 중... {n}쪽"))
+        status.empty()
+        # 세션에는 파일 경로만 보관
+        st.session_state[f"report_volumes_{key}"] = volumes
+        st.session_state[f"report_fresh_{key}"] = True
+    
+    volumes = [v for v in st.session_state.get(f"report_volumes_{key}", []) if os.path.exists(v[0])]
+    if volumes:
+        if sum(pages for _, pages in volumes) >= REPORT_MAX_PAGES:
+            st.caption(f"최대 {REPORT_MAX_PAGES}쪽까지만 포함했습니다.")
+        index = 0
+        if len(volumes) > 1:
+            st.caption(f"보고서가 커서 {len(volumes)}개 파일로 나눴습니다. 파일마다 따로 받으세요.")
+            index = st.selectbox(
+                "파일", range(len(volumes)), key=f"report_volume_{key}",
+                format_func=lambda i: f"{i + 1}/{len(volumes)} ({volumes[i][1]}쪽, "
+                                      f"{os.path.getsize(volumes[i][0]) / 1024 / 1024:.1f}MB)"
+            )
+        path, pages = volumes[index]
+        # 다운로드 버튼은 파일 전체를 메모리에 올리므로 만든 직후(또는 요청했을 때) 한 파일만 표시
+        if (st.session_state.pop(f"report_fresh_{key}", False)
+                or st.button("📥 선택한 파일 받기" if len(volumes) > 1 else "📥 보고서 다시 받기",
+                             key=f"report_again_{key}", use_container_width=True)):
+            size = os.path.getsize(path)
+            with open(path, 'rb') as f:
+                st.download_button(
+                    f"📥 보고서 다운로드 ({pages}쪽, {size / 1024 / 1024:.1f}MB)", data=f,
+                    file_name=os.path.basename(path),
+                    mime="application/pdf" if path.endswith('.pdf') else "text/html",
+                    key=f"report_download_{key}", use_container_width=True
+                )
+
+def render_perf_dashboard():
+    """관리자용 성능 대시보드 (구간별 지연 시간 및 배치 타임라인)"""
+    import pandas as pd
+    
+    st.markdown('<h1 class="glow-header">📈 성능 대시보드</h1>', unsafe_allow_html=True)
+    st.markdown(f'<p class="sub-header">트레이스 파일: {TRACE_FILE}</p>', unsafe_allow_html=True)
+    
+    spans = load_spans()
+    if not spans:
+        st.info("아직 기록된 트레이스가 없습니다.")
+        return
+    
+    summary = summarize_spans(spans)
+    
+    # 구간별 통계
+    st.markdown("### ⏱️ 구간별 지연 시간")
+    st.dataframe(pd.DataFrame([
+        {'구간': name, '횟수': info['count'], 'p50 (ms)': info['p50'],
+         'p95 (ms)': info['p95'], '최대 (ms)': info['max']}
+        for name, info in sorted(summary.items(), key=lambda kv: -kv[1]['p95'])
+    ]), use_container_width=True, hide_index=True)
+    
+    stage = st.selectbox("히스토그램 구간", sorted(summary.keys()))
+    if stage:
+        histogram = summary[stage]['histogram']
+        st.bar_chart(pd.DataFrame({'횟수': list(histogram.values())}, index=list(histogram.keys())))
+    
+    # 최근 배치 타임라인
+    st.markdown("---")
+    st.markdown("### 🗂️ 최근 배치 타임라인")
+    last_n = st.slider("표시할 배치 수", min_value=1, max_value=50, value=10)
+    batches = batch_timeline(spans, last_n)
+    if not batches:
+        st.caption("완료된 배치가 없습니다.")
+        return
+    
+    index = [datetime.fromtimestamp(b['start']).strftime('%m-%d %H:%M:%S') for b in batches]
+    st.bar_chart(pd.DataFrame(
+        [{stage: b['stages'].get(stage, 0) / 1000 for stage in TIMELINE_STAGES} for b in batches],
+        index=index
+    ))
+    st.dataframe(pd.DataFrame([
+        {'시작': label, 'URL 수': b['attrs'].get('url_count'),
+         '사용자': b['attrs'].get('user'), '총 소요 (s)': round(b['duration_ms'] / 1000, 2)}
+        for label, b in zip(index, batches)
+    ]), use_container_width=True, hide_index=True)
+
 def auto_install_browsers():
     """앱 시작 시 Playwright 브라우저 자동 설치"""
     cache_file = Path(tempfile.gettempdir()) / ".playwright_browsers_ok_v2"
@@ -692,6 +3383,10 @@ def main():
     # 데이터베이스 초기화
     init_db()
     
+    # 정기 검사 스케줄러 시작 (프로세스당 한 번)
+    if SCHEDULER_ENABLED and PLAYWRIGHT_AVAILABLE:
+        get_check_scheduler()
+    
     # 스크린샷 디렉토리 생성
     Path(SCREENSHOTS_DIR).mkdir(parents=True, exist_ok=True)
     
@@ -723,6 +3418,8 @@ def main():
         st.session_state.view_history_id = None
     if 'checking' not in st.session_state:
         st.session_state.checking = False
+    if 'view_perf_dashboard' not in st.session_state:
+        st.session_state.view_perf_dashboard = False
     
     # ========== 사이드바 ==========
     with st.sidebar:
@@ -797,55 +3494,231 @@ def main():
                 st.session_state.username = None
                 st.session_state.current_results = None
                 st.session_state.view_history_id = None
+                st.session_state.view_perf_dashboard = False
                 st.rerun()
             
+            if is_admin(st.session_state.username):
+                if st.button("📈 성능 대시보드", key="perf_dashboard_btn", use_container_width=True):
+                    st.session_state.view_perf_dashboard = True
+                    st.session_state.view_history_id = None
+                    st.rerun()
+            
             st.markdown("---")
             
             # URL 입력 섹션
             st.markdown("### 📝 검사할 페이지")
-            st.caption("최대 10개 URL 입력 가능")
-            
-            num_urls = st.number_input("URL 개수", min_value=1, max_value=10, value=1)
+            input_mode = st.radio("입력 방식", ["직접 입력", "자동 탐색"], horizontal=True, key="input_mode")
             
             url_inputs = []
-            for i in range(int(num_urls)):
-                st.markdown(f"**페이지 {i+1}**")
-                title = st.text_input(f"제목", key=f"title_{i}", placeholder="페이지명", label_visibility="collapsed")
-                url = st.text_input(f"URL", key=f"url_{i}", placeholder="https://...", label_visibility="collapsed")
-                if title and url:
-                    # URL 검증
-                    if not url.startswith(('http://', 'https://')):
-                        url = 'https://' + url
-                    url_inputs.append((title, url))
+            discovery = None
+            if input_mode == "직접 입력":
+                st.caption("최대 10개 URL 입력 가능")
+                
+                num_urls = st.number_input("URL 개수", min_value=1, max_value=10, value=1)
+                
+                for i in range(int(num_urls)):
+                    st.markdown(f"**페이지 {i+1}**")
+                    title = st.text_input(f"제목", key=f"title_{i}", placeholder="페이지명", label_visibility="collapsed")
+                    url = st.text_input(f"URL", key=f"url_{i}", placeholder="https://...", label_visibility="collapsed")
+                    region = st.text_input(
+                        "캡처 영역", key=f"region_{i}", placeholder="캡처 영역 (선택): CSS 선택자 또는 x,y,너비,높이",
+                        label_visibility="collapsed",
+                        help="지정하면 브라우저 캡처를 해당 요소/영역만 찍습니다. 선택자와 맞는 요소가 없으면 화면 전체를 캡처합니다."
+                    )
+                    try:
+                        parse_capture_region(region)
+                    except ValueError as e:
+                        st.error(str(e))
+                        region = ''
+                    if title and url:
+                        # URL 검증
+                        if not url.startswith(('http://', 'https://')):
+                            url = 'https://' + url
+                        url_inputs.append((title, url, region.strip()))
+                    st.markdown("---")
+            else:
+                st.caption("루트 URL을 크롤링하거나 sitemap.xml을 읽어 발견되는 대로 검사합니다.")
+                root_url = st.text_input("루트 URL 또는 사이트맵", key="discovery_root",
+                                         placeholder="https://example.com/sitemap.xml")
+                max_pages = st.number_input("최대 페이지 수", min_value=1, max_value=DISCOVERY_MAX_PAGES,
+                                            value=20, key="discovery_max_pages")
+                max_depth = st.number_input("최대 링크 깊이", min_value=0, max_value=5, value=2,
+                                            key="discovery_max_depth")
+                include = st.text_input("포함 패턴 (정규식, 쉼표 구분)", key="discovery_include",
+                                        placeholder="/products/")
+                exclude = st.text_input("제외 패턴 (정규식, 쉼표 구분)", key="discovery_exclude",
+                                        placeholder="/login, \\?page=")
+                if root_url:
+                    if not root_url.startswith(('http://', 'https://')):
+                        root_url = 'https://' + root_url
+                    try:
+                        _parse_patterns(include)
+                        _parse_patterns(exclude)
+                        discovery = {
+                            'root': root_url, 'max_pages': int(max_pages), 'max_depth': int(max_depth),
+                            'include': include, 'exclude': exclude,
+                        }
+                    except re.error as e:
+                        st.error(f"패턴 오류: {e}")
                 st.markdown("---")
             
+            capture_profiles = st.multiselect(
+                "📱 캡처 디바이스", options=list(DEVICE_PROFILES.keys()), default=['desktop'],
+                format_func=lambda name: f"{DEVICE_PROFILES[name]['label']} ({DEVICE_PROFILES[name]['width']}px)",
+                key="capture_profiles",
+                help="브라우저당 한 번 접속한 페이지에서 뷰포트만 바꿔 추가 캡처합니다."
+            )
+            
+            use_shared_cache = False
+            if SHARED_CACHE_ENABLED:
+                use_shared_cache = st.checkbox(
+                    "🗄️ 공유 캐시 사용", key="use_shared_cache",
+                    help=f"최근 {int(SHARED_CACHE_TTL // 60)}분 안에 다른 사용자가 캡처한 같은 URL은 "
+                         "다시 캡처하지 않고 재사용합니다. 이 검사의 캡처도 캐시에 공유됩니다."
+                )
+            
             if st.button("🚀 검사 시작", key="start_check", use_container_width=True, type="primary"):
-                if url_inputs:
+                if url_inputs or discovery:
+                    st.session_state.profiles_to_check = capture_profiles or ['desktop']
+                    st.session_state.shared_cache_for_check = use_shared_cache
                     st.session_state.current_results = None
                     st.session_state.view_history_id = None
                     st.session_state.checking = True
+                    st.session_state.view_perf_dashboard = False
                     st.session_state.urls_to_check = url_inputs
+                    st.session_state.discovery = discovery
                     st.rerun()
                 else:
                     st.warning("최소 1개의 페이지 정보를 입력해주세요.")
             
+            # 정기 검사 (URL 세트 저장 및 관리)
+            with st.expander("🗓️ 정기 검사"):
+                if url_inputs:
+                    set_name = st.text_input("세트 이름", key="url_set_name", placeholder="예: 주간 증빙")
+                    set_interval = st.selectbox("주기", list(SCHEDULE_INTERVALS), index=1,
+                                                format_func=SCHEDULE_INTERVALS.get, key="url_set_interval")
+                    if st.button("💾 입력한 URL을 정기 검사로 저장", key="save_url_set", use_container_width=True):
+                        create_url_set(
+                            st.session_state.user_id, set_name or f"URL 세트 ({len(url_inputs)}개)",
+                            url_inputs, capture_profiles or ['desktop'], set_interval,
+                            time.time(), SCHEDULE_JITTER
+                        )
+                        st.success("정기 검사가 저장되었습니다.")
+                else:
+                    st.caption("직접 입력한 URL 목록을 정기 검사로 저장할 수 있습니다.")
+                
+                for url_set in get_user_url_sets(st.session_state.user_id):
+                    next_label = datetime.fromtimestamp(url_set['next_run']).strftime('%m-%d %H:%M')
+                    interval_label = SCHEDULE_INTERVALS.get(url_set['interval_days'], f"{url_set['interval_days']}일")
+                    st.markdown(f"**{url_set['name']}** · {len(url_set['urls'])}개 · {interval_label}")
+                    if url_set['enabled']:
+                        st.caption(f"다음 실행: {next_label}")
+                    else:
+                        st.caption("일시 중지됨")
+                    col_toggle, col_run, col_delete = st.columns(3)
+                    with col_toggle:
+                        if st.button("⏸" if url_set['enabled'] else "▶", key=f"url_set_toggle_{url_set['id']}"):
+                            update_url_set(url_set['id'], st.session_state.user_id, enabled=not url_set['enabled'])
+                            st.rerun()
+                    with col_run:
+                        if st.button("⏩", key=f"url_set_run_{url_set['id']}", help="다음 조회 때 바로 실행"):
+                            update_url_set(url_set['id'], st.session_state.user_id, enabled=True,
+                                           next_run=time.time())
+                            st.rerun()
+                    with col_delete:
+                        if st.button("🗑", key=f"url_set_delete_{url_set['id']}"):
+                            delete_url_set(url_set['id'], st.session_state.user_id)
+                            st.rerun()
+            
             st.markdown("---")
             
             # 검사 히스토리
             st.markdown("### 📋 나의 점검 이력")
-            history = get_user_history(st.session_state.user_id)
+            search_query = st.text_input("🔎 검색", placeholder="제목 또는 URL", key="history_query")
+            search_host = None
+            date_from = date_to = None
+            result_filter = 'all'
+            min_change = None
+            min_w3c_errors = None
+            with st.expander("검색 조건"):
+                hosts = get_history_hosts(st.session_state.user_id)
+                host_choice = st.selectbox(
+                    "호스트", [None] + [h for h, _ in hosts],
+                    format_func=lambda h: "전체" if h is None else f"{h} ({dict(hosts)[h]})",
+                    key="history_host"
+                )
+                search_host = host_choice
+                if st.checkbox("기간 지정", key="history_use_dates"):
+                    today = datetime.now().date()
+                    dates = st.date_input(
+                        "기간", value=(today - timedelta(days=30), today), key="history_dates"
+                    )
+                    if len(dates) == 2:
+                        date_from, date_to = dates
+                result_filter = st.selectbox(
+                    "결과", list(HISTORY_RESULT_FILTERS),
+                    format_func=HISTORY_RESULT_FILTERS.get, key="history_result"
+                )
+                if result_filter == 'changed':
+                    min_change = st.slider(
+                        "변경 임계값 (%)", min_value=0.5, max_value=50.0,
+                        value=REGRESSION_THRESHOLD * 100, step=0.5, key="change_threshold"
+                    ) / 100
+                elif result_filter == 'w3c_errors':
+                    min_w3c_errors = st.number_input(
+                        "최소 오류 수", min_value=1, value=1, step=1, key="min_w3c_errors"
+                    )
+            
+            # 조건이 바뀌면 첫 페이지부터
+            search_key = (search_query, search_host, date_from, date_to, result_filter, min_change, min_w3c_errors)
+            if st.session_state.get('history_search_key') != search_key:
+                st.session_state.history_search_key = search_key
+                st.session_state.history_page = 0
+            page = st.session_state.get('history_page', 0)
+            history, total = search_history(
+                st.session_state.user_id, search_query, search_host, date_from, date_to,
+                result_filter, min_change, min_w3c_errors,
+                limit=HISTORY_PAGE_SIZE, offset=page * HISTORY_PAGE_SIZE
+            )
             
             if history:
-                for item in history[:10]:
-                    hist_id, title, url, _, created_at = item
+                st.caption(f"총 {HISTORY_COUNT_LIMIT}+건" if total > HISTORY_COUNT_LIMIT else f"총 {total}건")
+                for item in history:
+                    hist_id, title, url, created_at, change_score, w3c_errors, w3c_warnings = item
                     created_date = created_at[:10] if created_at else ""
                     display_title = title[:15] + "..." if len(title) > 15 else title
+                    change_label = f" Δ{change_score * 100:.0f}%" if change_score else ""
+                    w3c_label = f" 🔴{w3c_errors} 🟡{w3c_warnings}" if w3c_errors is not None else ""
                     
-                    if st.button(f"📄 {display_title} ({created_date})", key=f"hist_{hist_id}", use_container_width=True):
+                    if st.button(f"📄 {display_title} ({created_date}){change_label}{w3c_label}", key=f"hist_{hist_id}", use_container_width=True):
                         st.session_state.view_history_id = hist_id
+                        st.session_state.view_perf_dashboard = False
                         st.session_state.current_results = None
                         st.session_state.checking = False
                         st.rerun()
+                
+                last_page = (total - 1) // HISTORY_PAGE_SIZE
+                if last_page > 0:
+                    col_prev, col_page, col_next = st.columns([1, 2, 1])
+                    with col_prev:
+                        if st.button("◀", key="history_prev", disabled=page == 0):
+                            st.session_state.history_page = page - 1
+                            st.rerun()
+                    with col_page:
+                        st.caption(f"{page + 1} / {last_page + 1}")
+                    with col_next:
+                        if st.button("▶", key="history_next", disabled=page >= last_page):
+                            st.session_state.history_page = page + 1
+                            st.rerun()
+                
+                with st.expander("📑 검색 결과 보고서"):
+                    render_report_builder(lambda: iter_history_ids(
+                        st.session_state.user_id, query=search_query, host=search_host,
+                        date_from=date_from, date_to=date_to, result=result_filter,
+                        min_change=min_change, min_w3c_errors=min_w3c_errors
+                    ), "search")
+            elif search_key != ('', None, None, None, 'all', None, None):
+                st.caption("조건에 맞는 이력이 없습니다.")
             else:
                 st.caption("아직 점검 이력이 없습니다.")
     
@@ -900,6 +3773,14 @@ def main():
             5. **이력 조회**: 이전에 검사한 결과는 '나의 점검 이력'에서 다시 볼 수 있습니다.
             """)
     
+    elif st.session_state.view_perf_dashboard and is_admin(st.session_state.username) and not st.session_state.checking:
+        # 관리자 성능 대시보드
+        render_perf_dashboard()
+        st.markdown("---")
+        if st.button("← 대시보드로 돌아가기", key="perf_back", use_container_width=True):
+            st.session_state.view_perf_dashboard = False
+            st.rerun()
+    
     else:
         # 로그인 후 대시보드
         st.markdown('<h1 class="glow-header">📊 대시보드</h1>', unsafe_allow_html=True)
@@ -913,18 +3794,47 @@ def main():
             log_placeholder = st.empty()
             
             urls_to_check = st.session_state.get('urls_to_check', [])
+            discovery = st.session_state.get('discovery')
             all_results = []
             
-            for idx, (title, url) in enumerate(urls_to_check):
-                st.markdown(f"#### 📄 [{idx+1}/{len(urls_to_check)}] {title}")
-                
-                results = run_full_check(url, title, st.session_state.user_id, progress_placeholder, log_placeholder)
-                if results:
-                    all_results.append({
-                        'title': title,
-                        'url': url,
-                        'screenshots': results
-                    })
+            # 자동 탐색은 발견되는 즉시 캡처 (탐색 완료를 기다리지 않음)
+            if discovery:
+                targets = discover_urls(**discovery)
+                total_label = f"≤{discovery['max_pages']}"
+            else:
+                # 호스트를 번갈아 배치해 호스트별 요청 간격 대기를 다른 호스트 작업과 겹침
+                targets = interleave_by_host(urls_to_check)
+                total_label = str(len(urls_to_check))
+            
+            # 전역 대기열에서 자리를 받은 뒤 브라우저 세션을 열고, 자리를 가진 동안 컨텍스트 재사용
+            queue_placeholder = st.sidebar.empty()
+            
+            def show_queue(position: int, eta: float):
+                if not position:
+                    queue_placeholder.empty()
+                    return
+                eta_label = f"약 {eta:.0f}초" if eta < 60 else f"약 {eta / 60:.0f}분"
+                queue_placeholder.info(f"⏳ 검사 대기 중: {position}번째 (예상 대기 {eta_label})")
+            
+            with trace_span('batch', user=st.session_state.username, discovery=bool(discovery)) as batch_span, \
+                    AdmittedSession(st.session_state.user_id, show_queue) as admitted:
+                for idx, (title, url, *rest) in enumerate(targets):
+                    batch_span['attrs']['url_count'] = idx + 1
+                    st.markdown(f"#### 📄 [{idx+1}/{total_label}] {title}")
+                    
+                    session = admitted.session() if PLAYWRIGHT_AVAILABLE else None
+                    started = time.time()
+                    result = run_full_check(url, title, st.session_state.user_id, progress_placeholder, log_placeholder,
+                                            st.session_state.get('profiles_to_check'), session,
+                                            st.session_state.get('shared_cache_for_check', False),
+                                            region=rest[0] if rest else None)
+                    admitted.checkpoint(time.time() - started)
+                    # 세션에는 이력 ID만 보관 (이미지는 렌더링 시 저장소에서 조회)
+                    if result:
+                        all_results.append({
+                            'history_id': result['history_id'],
+                            'cached': result['cached']
+                        })
             
             progress_placeholder.progress(1.0, "✅ 완료!")
             st.session_state.checking = False
@@ -939,6 +3849,11 @@ def main():
                 st.markdown(f"### 📄 {history_data['page_title']}")
                 st.markdown(f"**URL:** `{history_data['url']}`")
                 st.markdown(f"**검사일:** {history_data['created_at']}")
+                if history_data['capture_region']:
+                    st.markdown(f"**캡처 영역:** `{history_data['capture_region']}`")
+                if history_data['status'] == 'running':
+                    st.info("⏳ 완료되지 않은 검사입니다. 지금까지 저장된 캡처만 표시합니다.")
+                render_capture_errors(history_data['errors'])
                 st.markdown("---")
                 
                 screenshots = history_data['screenshot_data']
@@ -946,6 +3861,7 @@ def main():
                 # W3C 결과
                 if 'w3c' in screenshots:
                     render_screenshot("W3C", screenshots['w3c'], "badge-w3c")
+                render_w3c_messages(history_data['id'], history_data['w3c_errors'], history_data['w3c_warnings'])
                 
                 st.markdown("---")
                 st.markdown("### 🌐 브라우저 호환성")
@@ -965,6 +3881,9 @@ def main():
                         if key in screenshots:
                             render_screenshot(name, screenshots[key], badge)
                 
+                render_diff_report(history_data['diff_data'])
+                render_profile_captures(screenshots, history_data['diff_data'])
+                
                 st.markdown("---")
                 if st.button("← 대시보드로 돌아가기", use_container_width=True):
                     st.session_state.view_history_id = None
@@ -975,14 +3894,22 @@ def main():
             st.markdown("### ✅ 검사 완료!")
             
             for result in st.session_state.current_results:
-                with st.expander(f"📄 {result['title']}", expanded=True):
-                    st.markdown(f"**URL:** `{result['url']}`")
+                history_data = get_history_by_id(result['history_id'])
+                if not history_data:
+                    continue
+                with st.expander(f"📄 {history_data['page_title']}", expanded=True):
+                    st.markdown(f"**URL:** `{history_data['url']}`")
+                    if result.get('cached'):
+                        st.caption("♻️ 공유 캐시에서 가져옴: " + ", ".join(k.upper() if k == 'w3c' else k.capitalize()
+                                                                       for k in result['cached']))
+                    render_capture_errors(history_data['errors'])
                     
-                    screenshots = result['screenshots']
+                    screenshots = history_data['screenshot_data']
                     
                     # W3C 결과
                     if 'w3c' in screenshots:
                         render_screenshot("W3C", screenshots['w3c'], "badge-w3c")
+                    render_w3c_messages(history_data['id'], history_data['w3c_errors'], history_data['w3c_warnings'])
                     
                     st.markdown("---")
                     st.markdown("#### 🌐 브라우저 호환성")
@@ -1001,8 +3928,15 @@ def main():
                         with col:
                             if key in screenshots:
                                 render_screenshot(name, screenshots[key], badge)
+                    
+                    render_diff_report(history_data['diff_data'])
+                    render_profile_captures(screenshots, history_data['diff_data'])
             
             st.markdown("---")
+            with st.expander("📑 이번 검사 증빙 보고서"):
+                render_report_builder(
+                    lambda: [r['history_id'] for r in st.session_state.current_results], "batch"
+                )
             if st.button("🔄 새 검사 시작", use_container_width=True):
                 st.session_state.current_results = None
                 st.rerun()
@@ -1048,16 +3982,16 @@ def main():
                 """, unsafe_allow_html=True)
             
             # 최근 검사 이력
-            history = get_user_history(st.session_state.user_id)
+            history, _ = search_history(st.session_state.user_id, limit=5)
             if history:
                 st.markdown("---")
                 st.markdown("### 📊 최근 검사 이력")
                 
-                for item in history[:5]:
-                    hist_id, title, url, _, created_at = item
+                for item in history:
+                    hist_id, title, url, created_at, _, w3c_errors, w3c_warnings = item
                     st.markdown(f"""
                         <div class="history-item">
-                            <strong style="color: #64ffda;">{title}</strong><br>
+                            <strong style="color: #64ffda;">{title}</strong> {w3c_badges(w3c_errors, w3c_warnings)}<br>
                             <span style="color: #666; font-size: 0.8rem;">{url}</span><br>
                             <span style="color: #888; font-size: 0.75rem;">{created_at}</span>
                         </div>
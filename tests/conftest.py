@@ -0,0 +1,7 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 테스트 실행이 저장소의 traces/spans.jsonl에 기록하지 않도록 트레이싱 끔
+os.environ['TRACE_ENABLED'] = '0'
@@ -0,0 +1,79 @@
+"""W3C 구조화 결과 조회/해석 테스트"""
+import json
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip('streamlit')
+
+import app
+
+
+NU_OUTPUT = {
+    'messages': [
+        {'type': 'error', 'lastLine': 12, 'extract': '<div id="a">', 'message': 'Duplicate ID “a”.'},
+        {'type': 'info', 'subType': 'warning', 'firstLine': 3, 'lastLine': 4, 'message': 'Consider adding a “lang” attribute.'},
+        {'type': 'info', 'message': 'Trailing slash on void elements has no effect.'},
+        {'type': 'non-document-error', 'subType': 'io', 'message': 'HTTP resource not retrievable.'},
+    ]
+}
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, 'DB_PATH', str(tmp_path / 'test.db'))
+    app.init_db()
+
+
+def test_fetch_w3c_json_parses_validator_output(db, monkeypatch):
+    requested = []
+
+    def fake_fetch(url, max_bytes, timeout):
+        requested.append(url)
+        return json.dumps(NU_OUTPUT).encode('utf-8'), 'application/json', url
+
+    monkeypatch.setattr(app, '_fetch', fake_fetch)
+    messages = app.parse_w3c_messages(app.fetch_w3c_json('https://example.com/a?b=1'))
+
+    assert requested[0].endswith('doc=https%3A%2F%2Fexample.com%2Fa%3Fb%3D1&out=json')
+    assert [m['type'] for m in messages] == ['error', 'warning', 'info', 'info']
+    assert messages[0]['line'] == 12 and messages[0]['extract'] == '<div id="a">'
+    assert messages[1]['line'] == 4
+
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+
+
+@pytest.fixture(scope='module')
+def browser_page():
+    sync_api = pytest.importorskip('playwright.sync_api')
+    with sync_api.sync_playwright() as pw:
+        try:
+            browser = pw.chromium.launch()
+        except Exception as e:
+            pytest.skip(f"Chromium 실행 불가: {e}")
+        page = browser.new_page()
+        yield page
+        browser.close()
+
+
+def test_read_w3c_results_from_validator_page(browser_page):
+    browser_page.set_content((FIXTURES / 'w3c_result.html').read_text(encoding='utf-8'))
+    messages = app.parse_w3c_messages(app.read_w3c_results(browser_page))
+
+    assert [m['type'] for m in messages] == ['error', 'warning', 'info', 'info']
+    assert messages[0]['line'] == 12
+    assert messages[0]['message'] == 'Duplicate ID a.'
+    assert '<div id="a">' in messages[0]['extract']
+    assert messages[1]['line'] == 2
+    assert messages[2]['line'] == 5 and messages[2]['extract'] is None
+    assert messages[3]['message'].startswith('HTTP resource not retrievable')
+
+
+def test_read_w3c_results_without_messages(browser_page):
+    browser_page.set_content((FIXTURES / 'w3c_success.html').read_text(encoding='utf-8'))
+    assert app.parse_w3c_messages(app.read_w3c_results(browser_page)) == []
+
+    # 결과 화면이 아니면 (로딩 중/검사기 오류) JSON 요청으로 대체하도록 None
+    browser_page.set_content('<html><body><p>Checking…</p></body></html>')
+    assert app.read_w3c_results(browser_page) is None